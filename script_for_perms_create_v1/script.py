@@ -2,9 +2,12 @@ import sys
 import yaml
 import uuid
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 
 USERNAME = None
 IP = None
+PAIRS_FILE = None
 CONFIG = {}
 
 
@@ -15,9 +18,95 @@ def load_config():
         return config
 
 
+def load_pairs(file_path):
+    """ 读取批量模式的 (用户名, 资产IP) 文件，每行一组，使用空格或逗号分隔，`#` 开头的行为注释
+    :return: [(行号, 用户名, 资产IP)]
+    """
+    pairs = []
+    with open(file_path) as f:
+        for line_number, line in enumerate(f, start=1):
+            line = line.strip()
+            if not line or line.startswith('#'):
+                continue
+            fields = line.replace(',', ' ').split()
+            if len(fields) != 2:
+                print("忽略格式错误的行 {}: {}".format(line_number, line))
+                continue
+            pairs.append((line_number, fields[0], fields[1]))
+    return pairs
+
+
+def bulk_create(url, data_list):
+    """ 通过列表请求体批量创建对象，每次提交 bulk_create_batch_size 个
+    :return: 与 data_list 一一对应的 [(创建的对象, 错误信息)]
+    """
+    batch_size = CONFIG.get('bulk_create_batch_size') or 100
+    results = []
+    for i in range(0, len(data_list), batch_size):
+        results.extend(bulk_create_batch(url, data_list[i:i + batch_size]))
+    return results
+
+
+def bulk_create_batch(url, batch):
+    res = HTTP.post(url, json=batch)
+    try:
+        res_data = res.json()
+    except ValueError:
+        res_data = None
+    if not isinstance(res_data, list) or len(res_data) != len(batch):
+        # 服务端不支持批量创建，逐个创建
+        return [bulk_create_one(url, data) for data in batch]
+    if res.status_code in [200, 201]:
+        return [(obj, None) for obj in res_data]
+
+    # 校验失败时整批都不会创建，重新提交校验通过的对象
+    valid = [data for data, error in zip(batch, res_data) if not error]
+    if not valid or len(valid) == len(batch):
+        return [(None, error or res.status_code) for error in res_data]
+    results_valid = iter(bulk_create_batch(url, valid))
+    return [(None, error) if error else next(results_valid) for error in res_data]
+
+
+def bulk_create_one(url, data):
+    res = HTTP.post(url, json=data)
+    try:
+        res_data = res.json()
+    except ValueError:
+        res_data = res.text
+    if res.status_code in [200, 201]:
+        return res_data, None
+    return None, res_data
+
+
 class HTTP:
     server = None
     token = None
+    session = None
+
+    @classmethod
+    def get_session(cls):
+        if cls.session is not None:
+            return cls.session
+        requests_config = CONFIG.get('requests') or {}
+        retry = Retry(
+            total=requests_config.get('max_retries', 3),
+            backoff_factor=requests_config.get('backoff_factor', 0.5),
+            status_forcelist=[429, 502, 503, 504],
+            allowed_methods=['GET', 'HEAD', 'OPTIONS'],
+            raise_on_status=False
+        )
+        adapter = HTTPAdapter(
+            pool_connections=requests_config.get('pool_connections', 10),
+            pool_maxsize=requests_config.get('pool_maxsize', 10),
+            max_retries=retry
+        )
+        session = requests.Session()
+        session.mount('http://', adapter)
+        session.mount('https://', adapter)
+        if not requests_config.get('keep_alive', True):
+            session.headers['Connection'] = 'close'
+        cls.session = session
+        return cls.session
 
     @classmethod
     def get_default_token(cls):
@@ -34,7 +123,7 @@ class HTTP:
         print("获取超级管理员 Token")
         data = {'username': username, 'password': password}
         url = "/api/authentication/v1/auth/"
-        res = requests.post(cls.server + url, data)
+        res = cls.get_session().post(cls.server + url, data)
         res_data = res.json()
         token = res_data.get('token')
         print("使用用户名密码获取 Token")
@@ -47,7 +136,7 @@ class HTTP:
             'Authorization': "Bearer {}".format(cls.token)
         }
         kwargs['headers'] = headers
-        res = requests.get(url, params, **kwargs)
+        res = cls.get_session().get(url, params=params, **kwargs)
         return res
 
     @classmethod
@@ -57,19 +146,31 @@ class HTTP:
             'Authorization': "Bearer {}".format(cls.token)
         }
         kwargs['headers'] = headers
-        res = requests.post(url, data, json, **kwargs)
+        res = cls.get_session().post(url, data, json, **kwargs)
+        return res
+
+    @classmethod
+    def patch(cls, url, data=None, json=None, **kwargs):
+        url = cls.server + url
+        headers = {
+            'Authorization': "Bearer {}".format(cls.token)
+        }
+        kwargs['headers'] = headers
+        res = cls.get_session().patch(url, data, json=json, **kwargs)
         return res
 
 
 class User(object):
-    def __init__(self):
+    # 同一进程内已查询或创建的用户: {username: id}
+    ids = {}
+
+    def __init__(self, username=None):
         self.id = None
-        self.username = USERNAME
+        self.username = username or USERNAME
         self.email_suffix = CONFIG.get('email_suffix')
 
     def input_preconditions(self):
-        if USERNAME:
-            self.username = USERNAME
+        if self.username:
             return
         default_username = CONFIG.get('user_username')
         if default_username:
@@ -82,27 +183,54 @@ class User(object):
 
     def exist(self):
         print("校验用户")
+        if self.username in User.ids:
+            self.id = User.ids[self.username]
+            return True
         url = '/api/users/v1/users/'
         params = {'username': self.username}
         res = HTTP.get(url, params=params)
         res_data = res.json()
         if res.status_code in [200, 201] and res_data:
             self.id = res_data[0].get('id')
+            User.ids[self.username] = self.id
             return True
         print("用户不存在: {}".format(self.username))
         return False
 
-    def create(self):
-        print("创建用户")
-        url = '/api/users/v1/users/'
+    def get_data(self):
         data = {
             'name': self.username,
             'username': self.username,
             'email': '{}@{}'.format(self.username, self.email_suffix),
             'is_active': True
         }
+        return data
+
+    def create(self):
+        print("创建用户")
+        url = '/api/users/v1/users/'
+        data = self.get_data()
         res = HTTP.post(url, data)
         self.id = res.json().get('id')
+        if self.id is not None:
+            User.ids[self.username] = self.id
+
+    @classmethod
+    def bulk_create(cls, users):
+        """ 批量创建用户
+        :return: 创建失败的用户 {username: 错误信息}
+        """
+        print("批量创建用户: {} 个".format(len(users)))
+        url = '/api/users/v1/users/'
+        results = bulk_create(url, [user.get_data() for user in users])
+        errors = {}
+        for user, (obj, error) in zip(users, results):
+            if obj is None:
+                errors[user.username] = error
+                continue
+            user.id = obj.get('id')
+            User.ids[user.username] = user.id
+        return errors
 
     def perform(self):
         if not self.username:
@@ -114,6 +242,9 @@ class User(object):
 
 
 class Node(object):
+    # 同一进程内已校验存在的ID，整个批次只校验一次
+    verified = set()
+
     def __init__(self):
         self.id = CONFIG.get('node_id')
 
@@ -129,11 +260,14 @@ class Node(object):
         self.input_preconditions()
 
     def exist(self):
+        if self.id in Node.verified:
+            return True
         print("校验资产节点")
         url = '/api/assets/v1/nodes/{}/'.format(self.id)
         res = HTTP.get(url)
         res_data = res.json()
         if res.status_code in [200, 201] and res_data:
+            Node.verified.add(self.id)
             return True
         print('节点不存在: {}'.format(self.id))
         return False
@@ -145,6 +279,9 @@ class Node(object):
 
 
 class AdminUser(object):
+    # 同一进程内已校验存在的ID，整个批次只校验一次
+    verified = set()
+
     def __init__(self):
         self.id = CONFIG.get('admin_user_id')
 
@@ -160,11 +297,14 @@ class AdminUser(object):
         self.input_preconditions()
 
     def exist(self):
+        if self.id in AdminUser.verified:
+            return True
         print("校验管理用户")
         url = '/api/assets/v1/admin-user/{}/'.format(self.id)
         res = HTTP.get(url)
         res_data = res.json()
         if res.status_code in [200, 201] and res_data:
+            AdminUser.verified.add(self.id)
             return True
         print("管理用户不存在: {}".format(self.id))
         return False
@@ -176,15 +316,17 @@ class AdminUser(object):
 
 
 class Asset(object):
-    def __init__(self):
+    # 同一进程内已查询或创建的资产: {ip: id}
+    ids = {}
+
+    def __init__(self, ip=None, admin_user=None, node=None):
         self.id = None
-        self.ip = IP
-        self.admin_user = AdminUser()
-        self.node = Node()
+        self.ip = ip or IP
+        self.admin_user = admin_user or AdminUser()
+        self.node = node or Node()
 
     def input_preconditions(self):
-        if IP:
-            self.ip = IP
+        if self.ip:
             return
         default_ip = CONFIG.get('asset_ip')
         if default_ip:
@@ -199,6 +341,9 @@ class Asset(object):
 
     def exist(self):
         print("校验资产")
+        if self.ip in Asset.ids:
+            self.id = Asset.ids[self.ip]
+            return True
         url = '/api/assets/v1/assets/'
         params = {
             'ip': self.ip
@@ -207,15 +352,12 @@ class Asset(object):
         res_data = res.json()
         if res.status_code in [200, 201] and res_data:
             self.id = res_data[0].get('id')
+            Asset.ids[self.ip] = self.id
             return True
         print("资产不存在: {}".format(self.ip))
         return False
 
-    def create(self):
-        print("创建资产")
-        self.admin_user.perform()
-        self.node.perform()
-        url = '/api/assets/v1/assets/'
+    def get_data(self):
         data = {
             'hostname': self.ip,
             'ip': self.ip,
@@ -223,8 +365,37 @@ class Asset(object):
             'nodes': [self.node.id],
             'is_active': True
         }
+        return data
+
+    def create(self):
+        print("创建资产")
+        self.admin_user.perform()
+        self.node.perform()
+        url = '/api/assets/v1/assets/'
+        data = self.get_data()
         res = HTTP.post(url, data)
         self.id = res.json().get('id')
+        if self.id is not None:
+            Asset.ids[self.ip] = self.id
+
+    @classmethod
+    def bulk_create(cls, assets):
+        """ 批量创建资产
+        :return: 创建失败的资产 {ip: 错误信息}
+        """
+        print("批量创建资产: {} 个".format(len(assets)))
+        assets[0].admin_user.perform()
+        assets[0].node.perform()
+        url = '/api/assets/v1/assets/'
+        results = bulk_create(url, [asset.get_data() for asset in assets])
+        errors = {}
+        for asset, (obj, error) in zip(assets, results):
+            if obj is None:
+                errors[asset.ip] = error
+                continue
+            asset.id = obj.get('id')
+            Asset.ids[asset.ip] = asset.id
+        return errors
 
     def perform(self):
         if not self.ip:
@@ -236,6 +407,9 @@ class Asset(object):
 
 
 class SystemUser(object):
+    # 同一进程内已校验存在的ID，整个批次只校验一次
+    verified = set()
+
     def __init__(self):
         self.id = CONFIG.get('system_user_id')
 
@@ -251,11 +425,14 @@ class SystemUser(object):
         self.input_preconditions()
 
     def exist(self):
+        if self.id in SystemUser.verified:
+            return True
         print("校验系统用户")
         url = '/api/assets/v1/system-user/{}/'.format(self.id)
         res = HTTP.get(url)
         res_data = res.json()
         if res.status_code in [200, 201] and res_data:
+            SystemUser.verified.add(self.id)
             return True
         print("系统用户不存在: {}".format(self.id))
         return False
@@ -267,12 +444,15 @@ class SystemUser(object):
 
 
 class AssetPermission(object):
+    # 同步模式下已存在的授权规则索引，整个批次只获取一次
+    index = None
+    member_fields = ['users', 'user_groups', 'system_users', 'assets', 'nodes']
 
-    def __init__(self):
+    def __init__(self, username=None, ip=None, admin_user=None, node=None, system_user=None):
         self.name = None
-        self.user = User()
-        self.asset = Asset()
-        self.system_user = SystemUser()
+        self.user = User(username)
+        self.asset = Asset(ip, admin_user, node)
+        self.system_user = system_user or SystemUser()
 
     def input_preconditions(self):
         manual = CONFIG.get('asset_permission_name_manual', False)
@@ -292,6 +472,9 @@ class AssetPermission(object):
         return prefix
 
     def get_name_suffix(self):
+        if CONFIG.get('asset_permission_sync', False):
+            # 同步模式下名称固定，重复执行时可以找到之前创建的授权规则
+            return "{}_{}".format(self.user.username, self.asset.ip)
         suffix_uuid = str(uuid.uuid4().hex[:6])
         suffix = "{}_{}_{}".format(
             self.user.username, self.asset.ip, suffix_uuid
@@ -313,19 +496,77 @@ class AssetPermission(object):
         actions = CONFIG.get('asset_permission_actions', ['all'])
         return actions
 
-    def create(self):
-        print("创建资产授权规则")
-        url = '/api/perms/v1/asset-permissions/'
-        name = self.get_name()
-        actions = self.get_actions()
+    def get_data(self):
         data = {
-            'name': name,
+            'name': self.get_name(),
             'users': [self.user.id],
             'assets': [self.asset.id],
             'system_users': [self.system_user.id],
-            'actions': actions,
+            'actions': self.get_actions(),
             'is_active': True
         }
+        return data
+
+    @classmethod
+    def get_members(cls, data):
+        return tuple(frozenset(data.get(field) or []) for field in cls.member_fields)
+
+    @classmethod
+    def add_to_index(cls, permission):
+        if cls.index is None:
+            return
+        cls.index['names'][permission['name']] = permission
+        cls.index['members'].setdefault(cls.get_members(permission), permission)
+
+    @classmethod
+    def get_index(cls):
+        if cls.index is not None:
+            return cls.index
+        print("获取已存在的资产授权规则")
+        url = '/api/perms/v1/asset-permissions/'
+        res = HTTP.get(url)
+        res_data = res.json()
+        if res.status_code not in [200, 201]:
+            print("获取资产授权规则失败: {}".format(res_data))
+            sys.exit()
+        cls.index = {'names': {}, 'members': {}}
+        for permission in res_data:
+            cls.add_to_index(permission)
+        return cls.index
+
+    def sync(self):
+        """ 同步模式: 已存在相同成员的授权规则时跳过，同名授权规则成员有变化时只更新变化的字段 """
+        print("同步资产授权规则")
+        data = self.get_data()
+        index = self.get_index()
+        permission = index['names'].get(data['name']) or index['members'].get(self.get_members(data))
+        if permission is None:
+            return self.create()
+        changes = {}
+        for field in ['users', 'assets', 'system_users', 'actions']:
+            value = permission.get(field)
+            if isinstance(value, list) and set(value) != set(data[field]):
+                changes[field] = data[field]
+        if permission['name'] != data['name'] or not changes:
+            print("资产授权规则已存在，跳过: {}".format(permission['name']))
+            return True
+        print("更新资产授权规则: {} {}".format(permission['name'], list(changes)))
+        url = '/api/perms/v1/asset-permissions/{}/'.format(permission['id'])
+        res = HTTP.patch(url, json=changes)
+        res_data = res.json()
+        if res.status_code in [200, 201]:
+            self.add_to_index(res_data)
+            print("更新资产授权规则成功")
+            return True
+        print("response: ")
+        print(res_data)
+        print("更新资产授权规则失败")
+        return False
+
+    def create(self):
+        print("创建资产授权规则")
+        url = '/api/perms/v1/asset-permissions/'
+        data = self.get_data()
         print("data: ")
         print(data)
         res = HTTP.post(url, data)
@@ -334,16 +575,24 @@ class AssetPermission(object):
             print("response: ")
             print(res_data)
             print("创建资产授权规则成功")
+            self.add_to_index(res_data)
+            return True
         else:
             print("response: ")
             print(res_data)
             print("创建授权规则失败")
+            return False
 
     def perform(self):
         self.user.perform()
         self.asset.perform()
         self.system_user.perform()
-        self.create()
+        if self.user.id is None or self.asset.id is None:
+            print("用户或资产创建失败，不创建授权规则")
+            return False
+        if CONFIG.get('asset_permission_sync', False):
+            return self.sync()
+        return self.create()
 
 
 class APICreateAssetPermission(object):
@@ -378,19 +627,122 @@ class APICreateAssetPermission(object):
         HTTP.server = self.server
         HTTP.get_token(self.superuser_username, self.superuser_password)
 
+    def get_prerequisites(self):
+        return self.perm.asset.admin_user, self.perm.asset.node, self.perm.system_user
+
+    def validate_prerequisites(self):
+        """ 在创建用户/资产之前校验管理用户、节点、系统用户，不存在时直接退出；
+        未配置的管理用户、节点只在需要创建资产时校验 """
+        print("校验前置条件")
+        admin_user, node, system_user = self.get_prerequisites()
+        for obj, label in [(admin_user, '管理用户'), (node, '节点')]:
+            if obj.id is None:
+                print("未配置{}ID，资产不存在时将无法创建资产".format(label))
+                continue
+            obj.perform()
+        system_user.perform()
+
     def perform(self):
         print("执行操作")
         self.init_http()
+        self.validate_prerequisites()
         self.perm.perform()
 
 
+class APIBulkCreateAssetPermission(APICreateAssetPermission):
+    """ 批量模式: 在同一进程内为文件中的每组 (用户名, 资产IP) 创建授权规则
+
+    所有授权规则共用 Token、HTTP 会话及已查询的用户/资产，
+    管理用户、节点、系统用户只需输入一次，授权规则名称自动生成；
+    不存在的用户、资产先汇总，再通过批量接口创建
+    """
+
+    def __init__(self, pairs):
+        self.pairs = pairs
+        self.admin_user = AdminUser()
+        self.node = Node()
+        self.system_user = SystemUser()
+        super().__init__()
+
+    def get_preconditions(self):
+        print("请输入前置条件: ")
+        self.input_preconditions()
+        self.admin_user.get_preconditions()
+        self.node.get_preconditions()
+        self.system_user.get_preconditions()
+
+    def get_prerequisites(self):
+        return self.admin_user, self.node, self.system_user
+
+    def validate_asset_prerequisites(self, assets_missing):
+        """ 有不存在的资产时，在创建任何用户之前校验管理用户、节点，无法创建资产时直接退出 """
+        for obj, label in [(self.admin_user, '管理用户'), (self.node, '节点')]:
+            if obj.id is None:
+                print("未配置{}ID，无法创建不存在的资产: {}".format(
+                    label, [asset.ip for asset in assets_missing]
+                ))
+                sys.exit()
+            obj.perform()
+
+    def prepare_users_and_assets(self):
+        """ 查询所有用户、资产，不存在的批量创建
+        :return: 创建失败的用户、资产 ({username: 错误信息}, {ip: 错误信息})
+        """
+        users = {}
+        assets = {}
+        for line_number, username, ip in self.pairs:
+            users.setdefault(username, User(username))
+            assets.setdefault(ip, Asset(ip, self.admin_user, self.node))
+        users_missing = [user for user in users.values() if not user.exist()]
+        assets_missing = [asset for asset in assets.values() if not asset.exist()]
+        if assets_missing:
+            self.validate_asset_prerequisites(assets_missing)
+        users_errors = User.bulk_create(users_missing) if users_missing else {}
+        assets_errors = Asset.bulk_create(assets_missing) if assets_missing else {}
+        return users_errors, assets_errors
+
+    def perform(self):
+        print("执行操作")
+        self.init_http()
+        self.validate_prerequisites()
+        users_errors, assets_errors = self.prepare_users_and_assets()
+        failed = []
+        for index, (line_number, username, ip) in enumerate(self.pairs, start=1):
+            print("[{}/{}] 用户: {}, 资产: {}".format(index, len(self.pairs), username, ip))
+            if username in users_errors:
+                failed.append((line_number, username, ip, '创建用户失败: {}'.format(users_errors[username])))
+                continue
+            if ip in assets_errors:
+                failed.append((line_number, username, ip, '创建资产失败: {}'.format(assets_errors[ip])))
+                continue
+            perm = AssetPermission(username, ip, self.admin_user, self.node, self.system_user)
+            try:
+                ok = perm.perform()
+            except (requests.RequestException, ValueError) as e:
+                print("创建授权规则出错: {}".format(e))
+                ok = False
+            if not ok:
+                failed.append((line_number, username, ip, '创建授权规则失败'))
+        print("批量创建完成: 共 {} 组, 成功 {} 组, 失败 {} 组".format(
+            len(self.pairs), len(self.pairs) - len(failed), len(failed)
+        ))
+        for line_number, username, ip, error in failed:
+            print("失败: 第 {} 行 {} {} {}".format(line_number, username, ip, error))
+
+
 if __name__ == '__main__':
     args = sys.argv
-    if len(args) >= 2:
-        USERNAME = args[1]
-    if len(args) >= 3:
-        IP = args[2]
+    if len(args) >= 3 and args[1] in ['-f', '--file']:
+        PAIRS_FILE = args[2]
+    else:
+        if len(args) >= 2:
+            USERNAME = args[1]
+        if len(args) >= 3:
+            IP = args[2]
 
     CONFIG = load_config()
-    api = APICreateAssetPermission()
+    if PAIRS_FILE:
+        api = APIBulkCreateAssetPermission(load_pairs(PAIRS_FILE))
+    else:
+        api = APICreateAssetPermission()
     api.perform()
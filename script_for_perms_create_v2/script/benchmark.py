@@ -0,0 +1,192 @@
+# -*- coding: utf-8 -*-
+
+"""
+benchmark.py - 端到端的授权规则批量创建性能测试
+
+针对本地模拟服务 (fake_server.py)，以清单方式 (--manifest) 非交互执行 main.py，
+分别测试不同资产数量下的总耗时、请求数、峰值内存及每秒创建的授权规则数，结果写入 json 文件
+
+执行方式：
+python benchmark.py [--sizes 10,1000,10000,100000] [--permissions 10] [--latency 0.005]
+                    [--output benchmark_result.json] [--compare 上次的结果.json]
+"""
+
+import os
+import sys
+import json
+import time
+import runpy
+import atexit
+import argparse
+import resource
+import tempfile
+import subprocess
+
+import yaml
+
+from fake_server import FakeJumpServer
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+EXAMPLE_CONFIG_FILE_PATH = os.path.join(os.path.dirname(SCRIPT_DIR), 'config_example.yml')
+
+
+def get_commit():
+    try:
+        return subprocess.check_output(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=SCRIPT_DIR, stderr=subprocess.DEVNULL
+        ).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def update_config(config_dict, extra_config):
+    for section, values in extra_config.items():
+        if isinstance(values, dict):
+            config_dict.setdefault(section, {}).update(values)
+        else:
+            config_dict[section] = values
+
+
+def write_config(work_dir, server_url, extra_config):
+    """ 以 config_example.yml 的默认配置为基础，缓存文件与日志保存在临时目录中，每次测试都从空缓存开始 """
+    with open(EXAMPLE_CONFIG_FILE_PATH, 'r', encoding='utf-8') as f:
+        config_dict = yaml.safe_load(f)
+    config_dict['server'] = server_url
+    config_dict['authentication'] = {
+        'type': 'api_key',
+        'api_key': {'access_key_id': 'benchmark', 'access_key_secret': 'benchmark'}
+    }
+    update_config(config_dict, {'log': {'file_path': os.path.join(work_dir, 'script_execute.log')}})
+    update_config(config_dict, extra_config)
+    config_file_path = os.path.join(work_dir, 'config.yml')
+    with open(config_file_path, 'w') as f:
+        yaml.safe_dump(config_dict, f)
+    return config_file_path
+
+
+def write_manifest(work_dir, assets_count, permissions_count):
+    """ 资产平均分配到各个授权规则中 """
+    permissions_count = max(1, min(permissions_count, assets_count))
+    hostnames = ['asset-hostname-{:02d}'.format(i + 1) for i in range(assets_count)]
+    chunk_size = -(-assets_count // permissions_count)
+    permissions = []
+    for index in range(permissions_count):
+        permissions.append({
+            'org': 'DEFAULT',
+            'name': 'benchmark-{}-{:03d}'.format(assets_count, index + 1),
+            'users': ['admin', 'user-01'],
+            'system_users': ['root'],
+            'assets': hostnames[index * chunk_size:(index + 1) * chunk_size]
+        })
+    manifest_file_path = os.path.join(work_dir, 'manifest.yml')
+    with open(manifest_file_path, 'w') as f:
+        yaml.safe_dump({'permissions': permissions}, f)
+    return manifest_file_path, permissions_count
+
+
+def run_child(config_file_path, manifest_file_path, rusage_file_path):
+    """ 子进程: 以 __main__ 方式执行 main.py，退出时记录峰值内存 """
+
+    def write_rusage():
+        with open(rusage_file_path, 'w') as f:
+            json.dump({'peak_rss_kb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss}, f)
+
+    atexit.register(write_rusage)
+    sys.path.insert(0, SCRIPT_DIR)
+    sys.argv = ['main.py', config_file_path, '--manifest', manifest_file_path,
+                '--report', manifest_file_path + '.report.json']
+    runpy.run_path(os.path.join(SCRIPT_DIR, 'main.py'), run_name='__main__')
+
+
+def run_case(assets_count, permissions_count, latency, extra_config):
+    with tempfile.TemporaryDirectory() as work_dir, \
+            FakeJumpServer(assets_count=assets_count, latency=latency) as server:
+        config_file_path = write_config(work_dir, server.url, extra_config)
+        manifest_file_path, permissions_count = write_manifest(work_dir, assets_count, permissions_count)
+        rusage_file_path = os.path.join(work_dir, 'rusage.json')
+
+        start = time.perf_counter()
+        process = subprocess.run(
+            [sys.executable, os.path.abspath(__file__), '--child',
+             config_file_path, manifest_file_path, rusage_file_path],
+            cwd=work_dir, stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE
+        )
+        wall_time = time.perf_counter() - start
+        if process.returncode != 0:
+            print(process.stderr.decode()[-2000:])
+
+        with open(manifest_file_path + '.report.json') as f:
+            report = json.load(f)
+        with open(rusage_file_path) as f:
+            peak_rss_kb = json.load(f)['peak_rss_kb']
+
+        permissions_created = report['created']
+        return {
+            'assets': assets_count,
+            'permissions': permissions_count,
+            'permissions_created': permissions_created,
+            'wall_time_s': round(wall_time, 3),
+            'requests': server.requests_count,
+            'peak_rss_kb': peak_rss_kb,
+            'permissions_per_s': round(permissions_created / wall_time, 3)
+        }
+
+
+def print_results(results, baseline=None):
+    baseline_by_assets = {}
+    if baseline is not None:
+        baseline_by_assets = {result['assets']: result for result in baseline['results']}
+    row = '{:>8} {:>6} {:>10} {:>9} {:>12} {:>10} {:>14}'
+    print(row.format('assets', 'perms', 'wall(s)', 'requests', 'rss(KB)', 'perms/s', 'vs baseline'))
+    for result in results:
+        compare = ''
+        base = baseline_by_assets.get(result['assets'])
+        if base is not None and result['wall_time_s']:
+            compare = '{:.2f}x'.format(base['wall_time_s'] / result['wall_time_s'])
+        print(row.format(
+            result['assets'], result['permissions_created'], result['wall_time_s'],
+            result['requests'], result['peak_rss_kb'], result['permissions_per_s'], compare
+        ))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='端到端的授权规则批量创建性能测试')
+    parser.add_argument('--sizes', default='10,1000,10000,100000', help='资产数量，多个使用 `,` 分隔')
+    parser.add_argument('--permissions', type=int, default=10, help='每组测试创建的授权规则数量')
+    parser.add_argument('--latency', type=float, default=0.005, help='模拟服务每个请求的延迟 (秒)')
+    parser.add_argument('--config', default='{}', help='覆盖脚本配置的 json，如 \'{"requests": {"async": true}}\'')
+    parser.add_argument('--output', default='benchmark_result.json', help='结果输出文件')
+    parser.add_argument('--compare', help='与之前的结果文件对比')
+    parser.add_argument('--child', nargs=3, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        run_child(*args.child)
+        return
+
+    extra_config = json.loads(args.config)
+    results = []
+    for size in [int(size) for size in args.sizes.split(',') if size]:
+        print('running: {} assets ...'.format(size))
+        results.append(run_case(size, args.permissions, args.latency, extra_config))
+
+    output = {
+        'commit': get_commit(),
+        'time': time.strftime('%Y-%m-%d %H:%M:%S'),
+        'latency': args.latency,
+        'config': extra_config,
+        'results': results
+    }
+    with open(args.output, 'w') as f:
+        json.dump(output, f, indent=4)
+
+    baseline = None
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+    print_results(results, baseline)
+    print('结果已写入: {}'.format(args.output))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,82 @@
+# -*- coding: utf-8 -*-
+
+"""
+benchmark_signing.py - 对比每次请求重新生成签名认证及请求头 / 复用签名认证及请求头的开销
+
+不发送网络请求，只计算 准备请求头 + 签名 + 构造请求 的耗时
+
+执行方式：
+python benchmark_signing.py [请求次数，默认 10000]
+"""
+
+import sys
+import time
+import requests
+from httpsig.requests_auth import HTTPSignatureAuth
+
+import main
+
+URL = 'http://localhost/api/v1/assets/assets/?hostname=asset-hostname-01'
+ORG = {'name': 'DEFAULT', 'id': ''}
+
+
+def init_config():
+    main.config = main.Config({
+        'server': 'http://localhost',
+        'authentication': {
+            'type': 'api_key',
+            'api_key': {
+                'access_key_id': '40bbc49d-e715-4664-82ce-7b622695550d',
+                'access_key_secret': 'b104126a-638f-4268-bf2d-a39e7810af4b'
+            }
+        },
+        'requests': {'ssl_verify': False},
+        'log': {'file_path': './script_execute.log'},
+        'cache': {'enabled': False}
+    })
+
+
+def prepare_uncached(count):
+    """ 修改前: 每次请求都重新生成请求头及签名认证 """
+    for _ in range(count):
+        headers = {
+            'X-JMS-ORG': ORG['id'],
+            'Content-Type': 'application/json',
+            'Accept': 'application/json',
+            'Date': "Mon, 17 Feb 2014 06:11:05 GMT",
+        }
+        auth = HTTPSignatureAuth(
+            key_id=main.config.authentication_api_key_access_key_id,
+            secret=main.config.authentication_api_key_access_key_secret,
+            headers=main.SIGNATURE_HEADERS
+        )
+        requests.Request('GET', URL, headers=headers, auth=auth).prepare()
+
+
+def prepare_cached(count):
+    """ 修改后: 复用 ServerProxy 的签名认证及每个组织的固定请求头 """
+    proxy = main.ServerProxy()
+    proxy.set_org(ORG)
+    for _ in range(count):
+        headers = proxy.generate_http_headers()
+        requests.Request('GET', URL, headers=headers, auth=proxy.http_signature_auth).prepare()
+    proxy.close()
+
+
+def run(func, count):
+    start = time.perf_counter()
+    func(count)
+    elapsed = time.perf_counter() - start
+    print('{:<20} total: {:8.3f} s  per request: {:8.2f} us'.format(
+        func.__name__, elapsed, elapsed / count * 1000000
+    ))
+    return elapsed
+
+
+if __name__ == '__main__':
+    request_count = int(sys.argv[1]) if len(sys.argv) >= 2 else 10000
+    init_config()
+    print('签名请求次数: {}'.format(request_count))
+    uncached = run(prepare_uncached, request_count)
+    cached = run(prepare_cached, request_count)
+    print('speedup: {:.2f}x'.format(uncached / cached))
@@ -0,0 +1,473 @@
+# -*- coding: utf-8 -*-
+
+"""
+fake_server.py - 本地模拟 JumpServer API 服务，用于离线测试及性能测试
+
+实现脚本用到的接口: 组织、用户、系统用户、资产 (支持过滤及 limit/offset 分页)、
+资产授权规则、授权规则与资产的关系、认证 Token (支持 MFA)、健康检查
+
+可配置数据量、请求延迟及错误率
+
+执行方式：
+python fake_server.py --port 8080 --assets 10000 --latency 0.05 --error-rate 0.01
+
+在代码中使用：
+server = FakeJumpServer(assets_count=1000)
+server.start()
+... server.url ...
+server.stop()
+"""
+
+import sys
+import json
+import time
+import uuid
+import random
+import argparse
+import itertools
+import threading
+from http.cookies import SimpleCookie
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlparse, parse_qs
+
+__all__ = [
+    'FakeJumpServer'
+]
+
+
+class FakeJumpServerData:
+    """ 模拟数据 - 组织、用户、系统用户、资产及创建的授权规则 """
+
+    def __init__(self, orgs_count=2, users_count=10, system_users_count=5, assets_count=100):
+        self.orgs = [{'id': '', 'name': 'DEFAULT'}] + [
+            {'id': str(uuid.uuid4()), 'name': 'org-{:02d}'.format(i + 1)} for i in range(orgs_count)
+        ]
+        self.users = [{'id': str(uuid.uuid4()), 'username': 'admin', 'name': 'Administrator'}] + [
+            {'id': str(uuid.uuid4()), 'username': 'user-{:02d}'.format(i + 1), 'name': 'user-{:02d}'.format(i + 1)}
+            for i in range(users_count)
+        ]
+        self.system_users = [{'id': str(uuid.uuid4()), 'name': 'root', 'username': 'root'}] + [
+            {'id': str(uuid.uuid4()), 'name': 'system-user-{:02d}'.format(i + 1), 'username': 'ops'}
+            for i in range(system_users_count)
+        ]
+        self.assets = [
+            {
+                'id': str(uuid.uuid4()),
+                'hostname': 'asset-hostname-{:02d}'.format(i + 1),
+                'ip': '10.{}.{}.{}'.format((i >> 16) & 255, (i >> 8) & 255, i & 255)
+            }
+            for i in range(assets_count)
+        ]
+        self.users_id = {user['id'] for user in self.users}
+        self.system_users_id = {system_user['id'] for system_user in self.system_users}
+        self.assets_id = {asset['id'] for asset in self.assets}
+        self.assets_by_hostname = {asset['hostname']: asset for asset in self.assets}
+        self.permissions = {}
+        # 授权规则与成员的关系ID: {(关系字段, 授权规则ID, 成员ID): 关系ID}
+        self.relations_id = {}
+        self.relations_by_id = {}
+        self.relations_id_counter = itertools.count(1)
+        self.lock = threading.Lock()
+
+    def filter_assets(self, query):
+        if 'hostname' in query:
+            asset = self.assets_by_hostname.get(query['hostname'])
+            return [asset] if asset else []
+        if 'hostname__in' in query:
+            hostnames = query['hostname__in'].split(',')
+            return [self.assets_by_hostname[h] for h in hostnames if h in self.assets_by_hostname]
+        return self.assets
+
+    @staticmethod
+    def filter_by(objs, query, fields):
+        for field in fields:
+            if field in query:
+                objs = [obj for obj in objs if obj.get(field) == query[field]]
+        return objs
+
+    def list_permissions(self, org_id, query):
+        with self.lock:
+            permissions = [p for p in self.permissions.values() if p['org_id'] == org_id]
+        return self.filter_by(permissions, query, ['name', 'id'])
+
+    def validate_permission(self, data, org_id, permission_id=None):
+        errors = {}
+        name = data.get('name')
+        if 'name' in data or permission_id is None:
+            if not name:
+                errors['name'] = ['This field is required.']
+            for permission in self.permissions.values():
+                if permission['org_id'] == org_id and permission['name'] == name and permission['id'] != permission_id:
+                    errors['name'] = ['Name already exists in this org.']
+        for field, valid_ids in [('users', self.users_id),
+                                 ('system_users', self.system_users_id),
+                                 ('assets', self.assets_id)]:
+            invalid = [pk for pk in data.get(field) or [] if pk not in valid_ids]
+            if invalid:
+                errors[field] = ['Invalid pk "{}" - object does not exist.'.format(invalid[0])]
+        return errors
+
+    def create_permission(self, data, org_id):
+        with self.lock:
+            errors = self.validate_permission(data, org_id)
+            if errors:
+                return 400, errors
+            permission = {
+                'id': str(uuid.uuid4()),
+                'org_id': org_id,
+                'name': data['name'],
+                'users': list(dict.fromkeys(data.get('users') or [])),
+                'user_groups': [],
+                'system_users': list(dict.fromkeys(data.get('system_users') or [])),
+                'assets': list(dict.fromkeys(data.get('assets') or [])),
+                'nodes': [],
+                'actions': data.get('actions') or ['all'],
+                'is_active': data.get('is_active', True)
+            }
+            self.permissions[permission['id']] = permission
+            return 201, permission
+
+    def update_permission(self, permission_id, data, org_id):
+        with self.lock:
+            permission = self.permissions.get(permission_id)
+            if permission is None or permission['org_id'] != org_id:
+                return 404, {'detail': 'Not found.'}
+            errors = self.validate_permission(data, org_id, permission_id)
+            if errors:
+                return 400, errors
+            for field in ['name', 'users', 'system_users', 'assets', 'actions', 'is_active']:
+                if field in data:
+                    permission[field] = data[field]
+            return 200, permission
+
+    def add_permission_relations(self, field, relations, org_id):
+        """ 批量添加授权规则与资产/用户/系统用户的关系 """
+        valid_ids = {
+            'asset': self.assets_id, 'user': self.users_id, 'systemuser': self.system_users_id
+        }[field]
+        field_permission = {'asset': 'assets', 'user': 'users', 'systemuser': 'system_users'}[field]
+        with self.lock:
+            for relation in relations:
+                permission = self.permissions.get(relation.get('assetpermission'))
+                if permission is None or permission['org_id'] != org_id:
+                    return 400, {'assetpermission': ['Invalid pk - object does not exist.']}
+                if relation.get(field) not in valid_ids:
+                    return 400, {field: ['Invalid pk - object does not exist.']}
+            for relation in relations:
+                permission = self.permissions[relation['assetpermission']]
+                if relation[field] not in permission[field_permission]:
+                    permission[field_permission].append(relation[field])
+        return 201, relations
+
+    def get_relation_id(self, field, permission_id, pk):
+        key = (field, permission_id, pk)
+        if key not in self.relations_id:
+            relation_id = next(self.relations_id_counter)
+            self.relations_id[key] = relation_id
+            self.relations_by_id[relation_id] = key
+        return self.relations_id[key]
+
+    def list_permission_relations(self, field, org_id, query):
+        """ 授权规则与资产/用户/系统用户的关系列表，与 JumpServer 一致只支持按授权规则及成员精确过滤 """
+        field_permission = {'asset': 'assets', 'user': 'users', 'systemuser': 'system_users'}[field]
+        relations = []
+        with self.lock:
+            for permission in self.permissions.values():
+                if permission['org_id'] != org_id:
+                    continue
+                if 'assetpermission' in query and permission['id'] != query['assetpermission']:
+                    continue
+                for pk in permission[field_permission]:
+                    if field in query and pk != query[field]:
+                        continue
+                    relations.append({
+                        'id': self.get_relation_id(field, permission['id'], pk),
+                        'assetpermission': permission['id'],
+                        field: pk
+                    })
+        return relations
+
+    def remove_permission_relation(self, field, relation_id, org_id):
+        """ 按关系ID删除一条关系 """
+        field_permission = {'asset': 'assets', 'user': 'users', 'systemuser': 'system_users'}[field]
+        with self.lock:
+            key = self.relations_by_id.get(relation_id)
+            if key is None or key[0] != field:
+                return 404, {'detail': 'Not found.'}
+            _, permission_id, pk = key
+            permission = self.permissions.get(permission_id)
+            if permission is None or permission['org_id'] != org_id or pk not in permission[field_permission]:
+                return 404, {'detail': 'Not found.'}
+            permission[field_permission].remove(pk)
+            del self.relations_by_id[relation_id]
+            del self.relations_id[key]
+        return 204, None
+
+
+class FakeJumpServerHandler(BaseHTTPRequestHandler):
+    """ 请求处理 - 按路径分发到对应的接口 """
+
+    protocol_version = 'HTTP/1.1'
+    server_version = 'FakeJumpServer/1.0'
+    # 响应头与响应体分开写入，关闭 Nagle 算法避免额外的延迟
+    disable_nagle_algorithm = True
+
+    RELATIONS_PATHS = {
+        '/api/v1/perms/asset-permissions-assets-relations/': 'asset',
+        '/api/v1/perms/asset-permissions-users-relations/': 'user',
+        '/api/v1/perms/asset-permissions-system-users-relations/': 'systemuser',
+    }
+
+    def log_message(self, format, *args):
+        if self.server.fake.verbose:
+            super().log_message(format, *args)
+
+    # response
+    def send_json(self, status, data=None):
+        body = b'' if data is None else json.dumps(data).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        for cookie in getattr(self, 'cookies_to_set', []):
+            self.send_header('Set-Cookie', cookie)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def send_list(self, objs, query):
+        """ 带 limit 参数时按 limit/offset 分页返回，否则直接返回列表 """
+        if 'limit' not in query:
+            return self.send_json(200, objs)
+        limit = int(query['limit'])
+        offset = int(query.get('offset', 0))
+        page = objs[offset:offset + limit]
+        has_next = offset + limit < len(objs)
+        return self.send_json(200, {
+            'count': len(objs),
+            'next': '{}?limit={}&offset={}'.format(self.path_only, limit, offset + limit) if has_next else None,
+            'previous': None,
+            'results': page
+        })
+
+    # request
+    def read_body(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        raw = self.rfile.read(length) if length else b''
+        if not raw:
+            return {}
+        content_type = self.headers.get('Content-Type', '')
+        if 'application/json' in content_type:
+            return json.loads(raw)
+        return {k: v[0] for k, v in parse_qs(raw.decode()).items()}
+
+    def get_session_id(self):
+        cookie = SimpleCookie(self.headers.get('Cookie', ''))
+        if 'sessionid' in cookie:
+            return cookie['sessionid'].value
+        session_id = uuid.uuid4().hex
+        self.cookies_to_set = ['sessionid={}; Path=/'.format(session_id)]
+        return session_id
+
+    def is_authenticated(self):
+        authorization = self.headers.get('Authorization', '')
+        if authorization.startswith('Signature '):
+            return True
+        keyword, _, token = authorization.partition(' ')
+        return token in self.server.fake.tokens
+
+    def prepare(self):
+        """ 注入延迟及错误，返回 False 表示已响应 """
+        fake = self.server.fake
+        self.cookies_to_set = []
+        parsed_url = urlparse(self.path)
+        self.path_only = parsed_url.path
+        self.query = {k: v[0] for k, v in parse_qs(parsed_url.query).items()}
+        self.org_id = self.headers.get('X-JMS-ORG', '')
+        with fake.lock:
+            fake.requests_count += 1
+        if fake.latency:
+            time.sleep(fake.latency + random.random() * fake.latency_jitter)
+        if fake.error_rate and random.random() < fake.error_rate:
+            self.send_json(503, {'detail': 'Injected error'})
+            return False
+        return True
+
+    def do_GET(self):
+        if not self.prepare():
+            return
+        data = self.server.fake.data
+        path = self.path_only
+
+        if path == '/api/health/':
+            return self.send_json(200, {'status': 'ok'})
+        if not self.is_authenticated():
+            return self.send_json(401, {'detail': 'Authentication credentials were not provided.'})
+        if path == '/api/v1/orgs/orgs/':
+            return self.send_list(data.filter_by(data.orgs, self.query, ['name']), self.query)
+        if path == '/api/v1/users/users/':
+            return self.send_list(data.filter_by(data.users, self.query, ['username']), self.query)
+        if path == '/api/v1/assets/system-users/':
+            return self.send_list(data.filter_by(data.system_users, self.query, ['name']), self.query)
+        if path == '/api/v1/assets/assets/':
+            return self.send_list(data.filter_assets(self.query), self.query)
+        if path == '/api/v1/perms/asset-permissions/':
+            return self.send_list(data.list_permissions(self.org_id, self.query), self.query)
+        if path in self.RELATIONS_PATHS:
+            relations = data.list_permission_relations(self.RELATIONS_PATHS[path], self.org_id, self.query)
+            return self.send_list(relations, self.query)
+        if path.startswith('/api/v1/perms/asset-permissions/'):
+            permissions = data.list_permissions(self.org_id, {'id': path.rstrip('/').rsplit('/', 1)[-1]})
+            if permissions:
+                return self.send_json(200, permissions[0])
+        return self.send_json(404, {'detail': 'Not found.'})
+
+    def do_POST(self):
+        if not self.prepare():
+            return
+        fake = self.server.fake
+        path = self.path_only
+        body = self.read_body()
+
+        if path == '/api/v1/authentication/tokens/':
+            return self.handle_token(body)
+        if path == '/api/v1/authentication/mfa/challenge/':
+            return self.handle_mfa_challenge(body)
+        if not self.is_authenticated():
+            return self.send_json(401, {'detail': 'Authentication credentials were not provided.'})
+        if path == '/api/v1/perms/asset-permissions/':
+            return self.send_json(*fake.data.create_permission(body, self.org_id))
+        if path in self.RELATIONS_PATHS:
+            relations = body if isinstance(body, list) else [body]
+            return self.send_json(*fake.data.add_permission_relations(
+                self.RELATIONS_PATHS[path], relations, self.org_id
+            ))
+        return self.send_json(404, {'detail': 'Not found.'})
+
+    def do_PATCH(self):
+        if not self.prepare():
+            return
+        if not self.is_authenticated():
+            return self.send_json(401, {'detail': 'Authentication credentials were not provided.'})
+        path = self.path_only
+        if path.startswith('/api/v1/perms/asset-permissions/'):
+            permission_id = path.rstrip('/').rsplit('/', 1)[-1]
+            return self.send_json(*self.server.fake.data.update_permission(
+                permission_id, self.read_body(), self.org_id
+            ))
+        return self.send_json(404, {'detail': 'Not found.'})
+
+    def do_DELETE(self):
+        if not self.prepare():
+            return
+        if not self.is_authenticated():
+            return self.send_json(401, {'detail': 'Authentication credentials were not provided.'})
+        path = self.path_only
+        for relations_path, field in self.RELATIONS_PATHS.items():
+            relation_id = path[len(relations_path):].strip('/')
+            if path.startswith(relations_path) and relation_id.isdigit():
+                return self.send_json(*self.server.fake.data.remove_permission_relation(
+                    field, int(relation_id), self.org_id
+                ))
+        return self.send_json(404, {'detail': 'Not found.'})
+
+    # authentication
+    def handle_token(self, body):
+        fake = self.server.fake
+        username = body.get('username')
+        password = body.get('password')
+        if fake.users_password.get(username) != password:
+            return self.send_json(400, {'error': 'password_failed', 'msg': 'Username/password invalid'})
+        session_id = self.get_session_id()
+        if fake.mfa and session_id not in fake.mfa_sessions:
+            return self.send_json(200, {'error': 'mfa_required', 'msg': 'MFA required'})
+        token = uuid.uuid4().hex
+        fake.tokens.add(token)
+        return self.send_json(201, {'token': token, 'keyword': 'Bearer', 'date_expired': None})
+
+    def handle_mfa_challenge(self, body):
+        fake = self.server.fake
+        if body.get('code') != fake.mfa_code:
+            return self.send_json(400, {'error': 'mfa_failed', 'msg': 'MFA code invalid'})
+        fake.mfa_sessions.add(self.get_session_id())
+        return self.send_json(200, {'msg': 'ok'})
+
+
+class FakeJumpServer:
+    """ 模拟 JumpServer 服务 - 在后台线程中运行 HTTP 服务
+
+    :param latency: 每个请求注入的固定延迟 (秒)
+    :param latency_jitter: 在固定延迟上额外增加的随机延迟上限 (秒)
+    :param error_rate: 请求返回 503 的概率 (0-1)
+    :param mfa: 获取 Token 时是否需要 MFA
+    """
+
+    def __init__(self, host='127.0.0.1', port=0, orgs_count=2, users_count=10, system_users_count=5,
+                 assets_count=100, latency=0.0, latency_jitter=0.0, error_rate=0.0,
+                 mfa=False, mfa_code='123456', verbose=False):
+        self.data = FakeJumpServerData(orgs_count, users_count, system_users_count, assets_count)
+        self.latency = latency
+        self.latency_jitter = latency_jitter
+        self.error_rate = error_rate
+        self.mfa = mfa
+        self.mfa_code = mfa_code
+        self.verbose = verbose
+        self.users_password = {'admin': 'admin'}
+        self.tokens = set()
+        self.mfa_sessions = set()
+        self.requests_count = 0
+        self.lock = threading.Lock()
+        self.httpd = ThreadingHTTPServer((host, port), FakeJumpServerHandler)
+        self.httpd.daemon_threads = True
+        self.httpd.fake = self
+        self.thread = None
+
+    @property
+    def url(self):
+        host, port = self.httpd.server_address[:2]
+        return 'http://{}:{}'.format(host, port)
+
+    def start(self):
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc, tb):
+        self.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='本地模拟 JumpServer API 服务')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8080)
+    parser.add_argument('--orgs', type=int, default=2, help='组织数量 (不含 DEFAULT)')
+    parser.add_argument('--users', type=int, default=10, help='用户数量 (不含 admin)')
+    parser.add_argument('--system-users', type=int, default=5, help='系统用户数量 (不含 root)')
+    parser.add_argument('--assets', type=int, default=100, help='资产数量')
+    parser.add_argument('--latency', type=float, default=0.0, help='每个请求的固定延迟 (秒)')
+    parser.add_argument('--latency-jitter', type=float, default=0.0, help='额外随机延迟上限 (秒)')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='请求返回 503 的概率 (0-1)')
+    parser.add_argument('--mfa', action='store_true', help='获取 Token 时需要 MFA (code: 123456)')
+    parser.add_argument('--verbose', action='store_true', help='打印每个请求')
+    args = parser.parse_args()
+
+    server = FakeJumpServer(
+        host=args.host, port=args.port, orgs_count=args.orgs, users_count=args.users,
+        system_users_count=args.system_users, assets_count=args.assets, latency=args.latency,
+        latency_jitter=args.latency_jitter, error_rate=args.error_rate, mfa=args.mfa, verbose=args.verbose
+    )
+    print('FakeJumpServer listening on {} (用户名/密码: admin/admin)'.format(server.url))
+    try:
+        server.httpd.serve_forever()
+    except KeyboardInterrupt:
+        server.httpd.server_close()
+        sys.exit(0)
+
+
+if __name__ == '__main__':
+    main()
@@ -4,19 +4,80 @@
 create_permission.py - 快速创建 JumpServer 资产授权规则
 
 执行方式：
-python create_permission.py config.yml
+python create_permission.py config.yml [--no-cache]
+python create_permission.py config.yml --manifest perms.yml [--report report.json] [--resume]
+python create_permission.py config.yml [--stats-json stats.json]
 """
 
+import re
 import sys
 import csv
 import os
+import mmap
+import uuid
+import queue
+import atexit
+import reprlib
 import yaml
 import json
+import time
+import sqlite3
+import hashlib
+import argparse
 import datetime
+import threading
+import contextvars
+from collections import OrderedDict
 import getpass
+import asyncio
+import itertools
 import requests
-from urllib.parse import urljoin
+from concurrent.futures import ThreadPoolExecutor
+from email.utils import formatdate
+from urllib.parse import urljoin, urlencode, urlparse
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 from httpsig.requests_auth import HTTPSignatureAuth
+from httpsig.sign import HeaderSigner
+
+try:
+    import aiohttp
+except ImportError:
+    aiohttp = None
+
+
+SIGNATURE_HEADERS = ['(request-target)', 'accept', 'date', 'host']
+
+# 授权规则成员字段对应的关系接口及关系字段，用于增量添加/移除成员
+ASSET_PERMISSION_RELATIONS = {
+    'users': ('/api/v1/perms/asset-permissions-users-relations/', 'user'),
+    'system_users': ('/api/v1/perms/asset-permissions-system-users-relations/', 'systemuser'),
+    'assets': ('/api/v1/perms/asset-permissions-assets-relations/', 'asset'),
+}
+# 本地查询缓存批量查询时每条 SQL 的键数量 (SQLite 默认最多 999 个参数)
+LOOKUP_CACHE_BATCH_SIZE = 500
+
+# 当前创建流程的关联ID，记录在每个请求的审计日志中
+current_correlation_id = contextvars.ContextVar('correlation_id', default=None)
+
+
+def new_correlation_id():
+    correlation_id = uuid.uuid4().hex[:16]
+    current_correlation_id.set(correlation_id)
+    return correlation_id
+
+
+def submit_with_context(executor, fn, *args):
+    """ 提交到线程池的任务在调用者的上下文中执行 (保留关联ID) """
+    return executor.submit(contextvars.copy_context().run, fn, *args)
+
+
+def raise_for_list_response(res, url):
+    """ 列表接口的某一页请求失败时抛出异常 (数据不完整，不能当作全部结果使用) """
+    if res.status_code == 200:
+        return
+    logger.error('获取列表失败: {} {} {}', url, res.status_code, res.reason)
+    raise requests.HTTPError('获取列表失败: {} {} {}'.format(url, res.status_code, res.reason), response=res)
 
 
 class Config:
@@ -35,8 +96,52 @@ class Config:
         # ssl verify
         self.ssl_verify = config_dict['requests']['ssl_verify']
 
+        # connection pool
+        self.requests_pool_connections = config_dict['requests'].get('pool_connections', 10)
+        self.requests_pool_maxsize = config_dict['requests'].get('pool_maxsize', 10)
+        self.requests_keep_alive = config_dict['requests'].get('keep_alive', True)
+        self.requests_max_retries = config_dict['requests'].get('max_retries', 3)
+        self.requests_backoff_factor = config_dict['requests'].get('backoff_factor', 0.5)
+        self.requests_timeout = config_dict['requests'].get('timeout', 30)
+        self.requests_max_workers = config_dict['requests'].get('max_workers', 10)
+        self.requests_asset_bulk_lookup_threshold = config_dict['requests'].get('asset_bulk_lookup_threshold', 200)
+        self.requests_page_size = config_dict['requests'].get('page_size', 500)
+        self.requests_page_prefetch = config_dict['requests'].get('page_prefetch', True)
+        self.requests_create_max_workers = config_dict['requests'].get('create_max_workers', 4)
+        self.requests_create_max_retries = config_dict['requests'].get('create_max_retries', 3)
+        self.requests_async = config_dict['requests'].get('async', False)
+        self.requests_async_max_concurrency = config_dict['requests'].get('async_max_concurrency', 100)
+
         # log
         self.log_file_path = config_dict['log']['file_path']
+        self.log_level = config_dict['log'].get('level', 'INFO')
+        self.log_max_bytes = config_dict['log'].get('max_bytes', 10 * 1024 * 1024)
+        self.log_backup_count = config_dict['log'].get('backup_count', 5)
+        self.log_max_message_length = config_dict['log'].get('max_message_length', 2000)
+        self.log_audit = config_dict['log'].get('audit', True)
+        self.log_audit_file_path = config_dict['log'].get('audit_file_path') or os.path.join(
+            os.path.dirname(self.log_file_path), 'script_audit.jsonl'
+        )
+
+        # permission chunk
+        permission_dict = config_dict.get('permission') or {}
+        self.permission_chunk_size = permission_dict.get('chunk_size', 0)
+        self.permission_chunk_mode = permission_dict.get('chunk_mode', 'relation')
+
+        # assets csv
+        assets_csv_dict = config_dict.get('assets_csv') or {}
+        self.assets_csv_encoding = assets_csv_dict.get('encoding', 'utf-8-sig')
+        self.assets_csv_hostname_column = assets_csv_dict.get('hostname_column', 'hostname')
+        self.assets_csv_batch_size = assets_csv_dict.get('batch_size', 1000)
+
+        # cache
+        cache_dict = config_dict.get('cache') or {}
+        self.cache_enabled = cache_dict.get('enabled', True)
+        self.cache_file_path = cache_dict.get('file_path') or os.path.join(
+            os.path.dirname(self.log_file_path), 'script_lookup_cache.sqlite3'
+        )
+        self.cache_ttl = cache_dict.get('ttl', 3600)
+        self.cache_memory_maxsize = cache_dict.get('memory_maxsize', 10000)
 
     def authentication_type_is_api_key(self):
         return self.authentication_type == 'api_key'
@@ -45,15 +150,30 @@ class Config:
         return self.authentication_type == 'user'
 
 
-class ServerProxy:
-    """ 服务代理者- 负责与JumpServer进行交互 """
+class BaseServerProxy:
+    """ 服务代理者基类 - 认证信息、组织、请求头及查询缓存等与请求方式无关的部分 """
 
-    def __init__(self):
+    def __init__(self, memo=None, cache=None, stats=None):
         self.token_data = None
         self.org = None
+        self.cache = cache if cache is not None else self.generate_cache()
+        self.memo = memo if memo is not None else LRUCache(config.cache_memory_maxsize)
+        self.stats = stats if stats is not None else RequestStats()
+        # 单次执行中复用的全量资产索引，按组织ID缓存
+        self.assets_indexes = {}
+        # 每个组织固定不变的请求头，按组织ID缓存
+        self.http_headers_cache = {}
+        self.http_date = (None, None)
+
+    @staticmethod
+    def generate_cache():
+        if not config.cache_enabled:
+            return None
+        return LookupCache(config.cache_file_path, config.cache_ttl)
 
     def set_token_data(self, token_data):
         self.token_data = token_data
+        self.http_headers_cache.clear()
 
     def get_token(self):
         return '{} {}'.format(self.token_data['keyword'], self.token_data['token'])
@@ -71,130 +191,659 @@ class ServerProxy:
         url = urljoin(config.server, path)
         return url
 
+    @staticmethod
+    def generate_http_signer():
+        return HeaderSigner(
+            key_id=config.authentication_api_key_access_key_id,
+            secret=config.authentication_api_key_access_key_secret,
+            headers=SIGNATURE_HEADERS
+        )
+
+    def get_http_date(self):
+        """ 当前时间的 HTTP Date，同一秒内复用已格式化的值 """
+        now = int(time.time())
+        second, http_date = self.http_date
+        if second != now:
+            http_date = formatdate(now, usegmt=True)
+            self.http_date = (now, http_date)
+        return http_date
+
+    def generate_http_headers(self, org=None):
+        """ 请求头中除 Date 外的部分每个组织只生成一次，Date 为发送请求时的当前时间 """
+        org_id = self.get_org_id() if org is None else org['id']
+        static_headers = self.http_headers_cache.get(org_id)
+        if static_headers is None:
+            static_headers = {
+                'X-JMS-ORG': org_id,
+                'Content-Type': 'application/json',
+                'Accept': 'application/json',
+            }
+            if config.authentication_type_is_user():
+                static_headers.update({
+                    'Authorization': self.get_token()
+                })
+            self.http_headers_cache[org_id] = static_headers
+        headers = dict(static_headers)
+        headers['Date'] = self.get_http_date()
+        return headers
+
+    def record_request(self, method, url, org, status, size, latency, retries):
+        """ 将一次请求计入请求统计，并记录到审计日志 (每个请求一行 json) """
+        path = urlparse(url).path
+        self.stats.record(method, path, status, size, latency)
+        if audit_logger is None:
+            return
+        record = {
+            'time': datetime.datetime.now().isoformat(),
+            'correlation_id': current_correlation_id.get(),
+            'method': method.upper(),
+            'path': path,
+            'org_id': self.get_org_id() if org is None else org['id'],
+            'status': status,
+            'size': size,
+            'latency_ms': round(latency * 1000, 3),
+            'retries': retries
+        }
+        audit_logger.write(json.dumps(record) + '\n')
+
+    def get_lookup_org_id(self, object_type):
+        """ 组织不属于任何组织，其余对象按当前组织区分 """
+        return '' if object_type == 'org' else self.get_org_id()
+
+    def get_lookup_key(self, object_type, key):
+        return self.get_lookup_org_id(object_type), object_type, key
+
+    def get_cached(self, object_type, key):
+        """ 依次从内存缓存、本地缓存中查询对象，均不存在时返回 None """
+        lookup_key = self.get_lookup_key(object_type, key)
+        obj = self.memo.get(lookup_key)
+        if obj is not None:
+            return obj
+        if self.cache is not None:
+            obj = self.cache.get(*lookup_key)
+            if obj is not None:
+                self.memo.set(lookup_key, obj)
+        return obj
+
+    def set_cached(self, object_type, key, obj):
+        lookup_key = self.get_lookup_key(object_type, key)
+        self.memo.set(lookup_key, obj)
+        if self.cache is not None:
+            self.cache.set(*lookup_key, obj)
+
+    def delete_cached(self, object_type, key):
+        lookup_key = self.get_lookup_key(object_type, key)
+        self.memo.delete(lookup_key)
+        if self.cache is not None:
+            self.cache.delete(*lookup_key)
+
+    def get_cached_many(self, object_type, keys):
+        """ 批量查询缓存，内存缓存未命中的键一次从本地缓存中查询
+        :return: 命中的对象 {key: obj}
+        """
+        objs = {}
+        keys_remaining = []
+        for key in keys:
+            obj = self.memo.get(self.get_lookup_key(object_type, key))
+            if obj is None:
+                keys_remaining.append(key)
+            else:
+                objs[key] = obj
+        if self.cache is not None and keys_remaining:
+            org_id = self.get_lookup_org_id(object_type)
+            objs_cached = self.cache.get_many(org_id, object_type, keys_remaining)
+            for key, obj in objs_cached.items():
+                self.memo.set(self.get_lookup_key(object_type, key), obj)
+            objs.update(objs_cached)
+        return objs
+
+    def set_cached_many(self, object_type, objs):
+        """ 批量写入缓存 {key: obj}，本地缓存在一个事务中提交 """
+        for key, obj in objs.items():
+            self.memo.set(self.get_lookup_key(object_type, key), obj)
+        if self.cache is not None and objs:
+            org_id = self.get_lookup_org_id(object_type)
+            self.cache.set_many(org_id, object_type, objs)
+
+    def delete_cached_many(self, object_type, keys):
+        for key in keys:
+            self.memo.delete(self.get_lookup_key(object_type, key))
+        if self.cache is not None and keys:
+            org_id = self.get_lookup_org_id(object_type)
+            self.cache.delete_many(org_id, object_type, keys)
+
+    def partition_cached(self, object_type, keys):
+        """ 去重后批量查询缓存
+        :return: (命中的对象 {key: obj}, 未命中的键列表)
+        """
+        keys_unique = list(dict.fromkeys(keys))
+        objs_found = self.get_cached_many(object_type, keys_unique)
+        keys_remaining = [key for key in keys_unique if key not in objs_found]
+        return objs_found, keys_remaining
+
+    def store_fetched(self, object_type, keys, objs):
+        """ 将从服务端获取的结果写入缓存，服务端不存在的对象从缓存中删除
+
+        :param objs: 与 keys 一一对应的对象，不存在时为 None
+        :return: 存在的对象 {key: obj}
+        """
+        objs_found = {key: obj for key, obj in zip(keys, objs) if obj is not None}
+        self.set_cached_many(object_type, objs_found)
+        self.delete_cached_many(object_type, [key for key in keys if key not in objs_found])
+        return objs_found
+
+    @staticmethod
+    def order_by_keys(keys, objs_found):
+        """ 按 keys 的顺序排列查询结果
+        :return: (对象列表, 不存在的键列表)
+        """
+        objs = []
+        keys_missing = []
+        for key in keys:
+            obj = objs_found.get(key)
+            if obj is None:
+                keys_missing.append(key)
+            else:
+                objs.append(obj)
+        return objs, keys_missing
+
+    @staticmethod
+    def use_assets_index(hostnames):
+        """ 主机名数量超过 asset_bulk_lookup_threshold 时使用全量资产索引，否则逐个查询 """
+        if len(hostnames) <= config.requests_asset_bulk_lookup_threshold:
+            return False
+        logger.info('资产数量超过 {}，使用全量资产索引查找', config.requests_asset_bulk_lookup_threshold)
+        return True
+
+    @staticmethod
+    def add_to_assets_index(index, asset):
+        """ 主机名重复的资产无法唯一确定，索引中对应的值为 None """
+        hostname = asset['hostname']
+        index[hostname] = None if hostname in index else asset
+
+    @staticmethod
+    def get_create_retry_delay(res, retries, name):
+        """ 创建授权规则返回 429/502/503/504 且未超过重试次数时，返回重试前等待的秒数，否则返回 None
+
+        优先使用 Retry-After 响应头，否则按指数退避
+        """
+        if res.status_code not in [429, 502, 503, 504] or retries >= config.requests_create_max_retries:
+            return None
+        retry_after = res.headers.get('Retry-After', '')
+        if retry_after.isdigit():
+            delay = int(retry_after)
+        else:
+            delay = config.requests_backoff_factor * (2 ** retries)
+        logger.info('创建授权规则 `{}` 返回 {}，{} 秒后第 {} 次重试', name, res.status_code, delay, retries + 1)
+        return delay
+
+    def handle_create_failure(self, res, org):
+        """ 创建授权规则失败: 引用的对象不存在时清除组织的缓存，并输出错误信息 """
+        if self.is_invalid_reference_response(res):
+            self.clear_org_cached(org)
+        client_proxy.print_error(res.reason)
+        client_proxy.print_error(res.content.decode())
+
+    def clear_org_cached(self, org):
+        """ 引用的对象可能已在服务端被删除，清除组织的缓存 (其他组织的缓存不受影响) """
+        logger.info('清除组织 `{}` 的缓存', org['name'])
+        self.memo.clear_org(org['id'])
+        self.assets_indexes.pop(org['id'], None)
+        if self.cache is not None:
+            self.cache.clear_org(org['id'])
+
+    @staticmethod
+    def is_created_by_previous_attempt(permission, data):
+        """ 重试创建授权规则返回 400 时，之前的请求可能已在服务端创建成功 (只是响应丢失)
+
+        同名且成员相同的授权规则视为之前的请求创建的
+        """
+        if permission is None:
+            return False
+        if get_asset_permission_members(permission) != get_asset_permission_members(data):
+            return False
+        logger.info('授权规则 `{}` 已由之前的请求创建', data['name'])
+        return True
+
+    @staticmethod
+    def is_invalid_reference_response(res):
+        """ 创建授权规则的响应是否表示引用的对象 (用户、系统用户、资产等) 在服务端不存在
+
+        名称重复等其他校验错误不代表缓存过期，不需要清除缓存
+        """
+        if res.status_code == 404:
+            return True
+        if res.status_code != 400:
+            return False
+        try:
+            errors = res.json()
+        except ValueError:
+            return False
+        return isinstance(errors, dict) and any(field in errors for field in ASSET_PERMISSION_MEMBER_FIELDS)
+
+
+class ServerProxy(BaseServerProxy):
+    """ 服务代理者- 负责与JumpServer进行交互 """
+
+    def __init__(self, memo=None, cache=None, stats=None):
+        super().__init__(memo=memo, cache=cache, stats=stats)
+        self.session = self.generate_session()
+        self.http_signature_auth = None
+        if config.authentication_type_is_api_key():
+            self.http_signature_auth = self.generate_http_signature_auth()
+        # 同步模式使用的授权规则索引，按组织ID缓存
+        self.asset_permissions_indexes = {}
+        self.asset_permissions_locks = {}
+        self.asset_permissions_locks_lock = threading.Lock()
+
+    @staticmethod
+    def generate_session():
+        """ 创建带连接池的会话，所有请求共用，避免每次请求重新建立 TCP/TLS 连接 """
+        retry = Retry(
+            total=config.requests_max_retries,
+            backoff_factor=config.requests_backoff_factor,
+            status_forcelist=[429, 502, 503, 504],
+            allowed_methods=['GET', 'HEAD', 'OPTIONS'],
+            raise_on_status=False
+        )
+        adapter = HTTPAdapter(
+            pool_connections=config.requests_pool_connections,
+            pool_maxsize=config.requests_pool_maxsize,
+            max_retries=retry
+        )
+        session = requests.Session()
+        session.mount('http://', adapter)
+        session.mount('https://', adapter)
+        if not config.requests_keep_alive:
+            session.headers['Connection'] = 'close'
+        return session
+
+    def close(self):
+        self.session.close()
+        if self.cache is not None:
+            self.cache.close()
+
     def generate_http_signature_auth(self):
-        signature_headers = ['(request-target)', 'accept', 'date', 'host']
+        """ 签名认证只在初始化时创建一次，之后的请求复用 """
         auth = HTTPSignatureAuth(
             key_id=config.authentication_api_key_access_key_id,
             secret=config.authentication_api_key_access_key_secret,
-            headers=signature_headers
+            headers=SIGNATURE_HEADERS
         )
         return auth
 
-    def generate_http_headers(self):
-        org_id = self.get_org_id()
-        headers = {
-            'X-JMS-ORG': org_id,
-            'Content-Type': 'application/json',
-            'Accept': 'application/json',
-            'Date': "Mon, 17 Feb 2014 06:11:05 GMT",
-        }
-        if config.authentication_type_is_user():
-            headers.update({
-                'Authorization': self.get_token()
-            })
-        return headers
-
     def get(self, url, params=None, **kwargs):
-        return requests.get(url, params=params, **kwargs)
+        return self.session.get(url, params=params, **kwargs)
 
     def post(self, url, data=None, **kwargs):
         json_data = json.dumps(data)
-        return requests.post(url, json_data, **kwargs)
+        return self.session.post(url, json_data, **kwargs)
 
-    def request(self, method, url, data=None, params=None, **kwargs):
-        assert method in ['get', 'post'], \
-            'method `{}` not allowed, must is `get` or `post`'.format(method)
+    def patch(self, url, data=None, **kwargs):
+        json_data = json.dumps(data)
+        return self.session.patch(url, json_data, **kwargs)
 
-        kwargs['headers'] = self.generate_http_headers()
+    def delete(self, url, params=None, **kwargs):
+        return self.session.delete(url, params=params, **kwargs)
+
+    def request(self, method, url, data=None, params=None, org=None, retries=0, **kwargs):
+        """ 发送请求并记录审计日志
+
+        :param retries: 调用者已重试的次数 (记录在审计日志中)
+        """
+        assert method in ['get', 'post', 'patch', 'delete'], \
+            'method `{}` not allowed, must is `get`, `post`, `patch` or `delete`'.format(method)
+
+        kwargs['headers'] = self.generate_http_headers(org)
 
         kwargs['verify'] = config.ssl_verify
+        kwargs['timeout'] = config.requests_timeout
 
-        if config.authentication_type_is_api_key():
-            kwargs['auth'] = self.generate_http_signature_auth()
+        if self.http_signature_auth is not None:
+            kwargs['auth'] = self.http_signature_auth
 
-        logger.info('向服务端发送请求')
-        logger.info('url: {}'.format(url))
+        logger.info('向服务端发送请求: {} {}', method.upper(), url)
         for k, v in kwargs.items():
-            logger.info('{}: {}'.format(k, v))
-
-        if method == 'get':
-            logger.info('params: {}'.format(params))
-            return self.get(url, params=params, **kwargs)
+            logger.debug('{}: {}', k, v)
 
-        if method == 'post':
-            logger.info('data: {}'.format(data))
-            return self.post(url, data=data, **kwargs)
+        start = time.perf_counter()
+        try:
+            if method in ['get', 'delete']:
+                logger.debug('params: {}', params)
+                res = getattr(self, method)(url, params=params, **kwargs)
+            else:
+                logger.debug('data: {}', data)
+                res = getattr(self, method)(url, data=data, **kwargs)
+        except requests.RequestException:
+            self.record_request(method, url, org, None, 0, time.perf_counter() - start, retries)
+            raise
+        latency = time.perf_counter() - start
+
+        # 连接池重试 (urllib3 Retry) 的次数
+        history = getattr(getattr(res.raw, 'retries', None), 'history', None) or ()
+        self.record_request(method, url, org, res.status_code, len(res.content), latency, retries + len(history))
+        return res
+
+    def iter_list(self, url, params=None, org=None):
+        """ 使用 limit/offset 分页获取列表数据，按页逐个返回对象
+
+        开启 page_prefetch 时，在处理当前页的同时于后台线程获取下一页
+        若服务端不支持分页（直接返回列表），则一次性返回全部对象
+        任意一页请求失败时抛出 requests.HTTPError，避免调用者把不完整的列表当作全部数据
+
+        :param url: 列表接口地址
+        :param params: 查询参数
+        :param org: 请求的组织，默认为当前组织
+        :return: 对象生成器
+        """
+        params = dict(params or {})
+        limit = config.requests_page_size
+
+        def fetch(offset):
+            page_params = dict(params, limit=limit, offset=offset)
+            return self.request('get', url, params=page_params, org=org)
+
+        executor = ThreadPoolExecutor(max_workers=1) if config.requests_page_prefetch else None
+        try:
+            offset = 0
+            res = fetch(offset)
+            while True:
+                raise_for_list_response(res, url)
+                data = res.json()
+                if isinstance(data, list):
+                    yield from data
+                    return
+                results = data.get('results') or []
+                offset += len(results)
+                has_next = bool(data.get('next')) and len(results) > 0
+                future = None
+                if has_next and executor is not None:
+                    future = submit_with_context(executor, fetch, offset)
+                yield from results
+                if not has_next:
+                    return
+                res = future.result() if future is not None else fetch(offset)
+        finally:
+            if executor is not None:
+                executor.shutdown(wait=False)
+
+    def lookup(self, object_type, key, fetch):
+        """ 查询对象，优先使用内存缓存及本地缓存，缓存不存在或过期时从服务端获取
+
+        :param object_type: 对象类型 (org/user/system_user/asset)
+        :param key: 查询条件，如用户名、主机名
+        :param fetch: 从服务端获取对象的方法
+        :return: 对象 或 None
+        """
+        obj = self.get_cached(object_type, key)
+        if obj is not None:
+            return obj
+        obj = fetch(key)
+        self.store_fetched(object_type, [key], [obj])
+        return obj
 
     def get_org(self, org_name):
+        return self.lookup('org', org_name, self.fetch_org)
+
+    def get_user(self, username):
+        return self.lookup('user', username, self.fetch_user)
+
+    def get_system_user(self, name):
+        return self.lookup('system_user', name, self.fetch_system_user)
+
+    def get_asset(self, hostname):
+        return self.lookup('asset', hostname, self.fetch_asset)
+
+    def fetch_org(self, org_name):
         url = self.generate_url('/api/v1/orgs/orgs/')
-        res = self.request('get', url)
-        if res.status_code in [200]:
-            org_list = res.json()
-            logger.info(org_list)
-            for org in org_list:
-                if org['name'] == org_name:
-                    return org
-        logger.error(res.reason)
+        for org in self.iter_list(url):
+            if org['name'] == org_name:
+                return org
+        logger.error('组织 `{}` 不存在', org_name)
         return None
 
-    def get_user(self, username):
+    def fetch_user(self, username):
         url = self.generate_url('/api/v1/users/users/')
         params = {'username': username}
-        res = self.request('get', url, params=params)
-        if res.status_code == 200:
-            users = res.json()
-            logger.info('User username: {}'.format(username))
-            logger.info('Get data form server: {}'.format(users))
-            if len(users) == 1:
-                return users[0]
+        users = list(itertools.islice(self.iter_list(url, params=params), 2))
+        logger.debug('User username: {}', username)
+        logger.debug('Get data form server: {}', users)
+        if len(users) == 1:
+            return users[0]
         return None
 
-    def get_system_user(self, name):
+    def fetch_system_user(self, name):
         url = self.generate_url('/api/v1/assets/system-users/')
         params = {'name': name}
-        res = self.request('get', url, params=params)
-        if res.status_code == 200:
-            system_users = res.json()
-            if len(system_users) == 1:
-                return system_users[0]
+        system_users = list(itertools.islice(self.iter_list(url, params=params), 2))
+        if len(system_users) == 1:
+            return system_users[0]
         return None
 
-    def get_asset(self, hostname):
+    def fetch_asset(self, hostname):
         url = self.generate_url('/api/v1/assets/assets/')
         params = {'hostname': hostname}
-        res = self.request('get', url, params=params)
-        if res.status_code == 200:
-            assets = res.json()
-            if len(assets) == 1:
-                return assets[0]
+        assets = list(itertools.islice(self.iter_list(url, params=params), 2))
+        if len(assets) == 1:
+            return assets[0]
         return None
 
-    def create_asset_permission(self, data):
+    def get_assets_index(self):
+        """ 分页获取组织下的全部资产，并建立 hostname -> asset 的索引
+
+        主机名重复的资产无法唯一确定，索引中对应的值为 None
+        索引在单次执行中按组织复用，分批获取资产时只请求一次
+        """
+        org_id = self.get_org_id()
+        index = self.assets_indexes.get(org_id)
+        if index is not None:
+            return index
+        url = self.generate_url('/api/v1/assets/assets/')
+        index = {}
+        for asset in self.iter_list(url):
+            self.add_to_assets_index(index, asset)
+        self.assets_indexes[org_id] = index
+        return index
+
+    def get_assets(self, hostnames, use_index=None):
+        """ 获取多个资产
+
+        主机名数量不超过 asset_bulk_lookup_threshold 时逐个并发查询，
+        超过时一次性获取全部资产并在本地索引中查找
+
+        :param hostnames: 资产主机名列表
+        :param use_index: 是否使用全量资产索引，默认按本次的主机名数量判断 (分批获取时由调用方统一指定)
+        :return: (按 hostnames 顺序排列的资产列表, 不存在的主机名列表)
+        """
+        assets_found, hostnames_remaining = self.partition_cached('asset', hostnames)
+        if use_index is None:
+            use_index = self.use_assets_index(hostnames_remaining)
+        results = []
+        if use_index and hostnames_remaining:
+            index = self.get_assets_index()
+            results = [index.get(hostname) for hostname in hostnames_remaining]
+        elif hostnames_remaining:
+            max_workers = max(1, min(config.requests_max_workers, len(hostnames_remaining)))
+            with ThreadPoolExecutor(max_workers=max_workers) as executor:
+                futures = [
+                    submit_with_context(executor, self.fetch_asset, hostname)
+                    for hostname in hostnames_remaining
+                ]
+                results = [future.result() for future in futures]
+        assets_found.update(self.store_fetched('asset', hostnames_remaining, results))
+        return self.order_by_keys(hostnames, assets_found)
+
+    def create_asset_permission(self, data, org=None):
+        """ 创建授权规则，服务端返回 429/502/503/504 时按指数退避重试
+
+        :param data: 授权规则数据
+        :param org: 授权规则所属组织，默认为当前组织（并发创建时需明确指定）
+        :return: 创建的授权规则 或 None
+        """
+        org = self.org if org is None else org
         url = self.generate_url('/api/v1/perms/asset-permissions/')
-        res = self.request('post', url, data=data)
+        retries = 0
+        while True:
+            res = self.request('post', url, data=data, org=org, retries=retries)
+            delay = self.get_create_retry_delay(res, retries, data.get('name'))
+            if delay is None:
+                break
+            retries += 1
+            time.sleep(delay)
+
         if res.status_code in [200, 201]:
             permission = res.json()
             return permission
-        else:
-            client_proxy.print_error(res.reason)
-            client_proxy.print_error(res.content.decode())
-            return None
+        if retries > 0 and res.status_code == 400:
+            permission = self.get_asset_permission(data['name'], org)
+            if self.is_created_by_previous_attempt(permission, data):
+                return permission
+        self.handle_create_failure(res, org)
+        return None
+
+    def get_asset_permission(self, name, org=None):
+        """ 根据名称获取授权规则 (不使用缓存)
+        :return: 授权规则 或 None
+        """
+        org = self.org if org is None else org
+        url = self.generate_url('/api/v1/perms/asset-permissions/')
+        permissions = list(itertools.islice(self.iter_list(url, params={'name': name}, org=org), 2))
+        if len(permissions) == 1:
+            return permissions[0]
+        return None
+
+    def get_asset_permissions_index(self, org=None):
+        """ 分页获取组织下的全部授权规则，建立名称及成员两个索引 (同步模式使用)
+
+        成员相同的授权规则只保留第一个，索引在单次执行中按组织复用
+        获取任意一页失败时抛出 requests.HTTPError，不缓存不完整的索引 (否则已存在的授权规则会被重复创建)
+
+        :return: {'names': {name: permission}, 'members': {成员: permission}}
+        """
+        org = self.org if org is None else org
+        index = self.asset_permissions_indexes.get(org['id'])
+        if index is not None:
+            return index
+        url = self.generate_url('/api/v1/perms/asset-permissions/')
+        index = {'names': {}, 'members': {}}
+        for permission in self.iter_list(url, org=org):
+            index['names'][permission['name']] = permission
+            index['members'].setdefault(get_asset_permission_members(permission), permission)
+        logger.info('组织 `{}` 下已存在 {} 条授权规则', org['name'], len(index['names']))
+        self.asset_permissions_indexes[org['id']] = index
+        return index
+
+    def get_asset_permission_lock(self, org, key):
+        """ 同步模式下组织中授权规则名称或成员对应的锁，key: ('name', 名称) 或 ('members', 成员) """
+        with self.asset_permissions_locks_lock:
+            return self.asset_permissions_locks.setdefault((org['id'], key), threading.Lock())
+
+    def update_asset_permission(self, permission_id, data, org=None):
+        """ 更新授权规则，只提交 data 中的字段
+        :return: 更新后的授权规则 或 None
+        """
+        org = self.org if org is None else org
+        url = self.generate_url('/api/v1/perms/asset-permissions/{}/'.format(permission_id))
+        res = self.request('patch', url, data=data, org=org)
+        if res.status_code in [200, 201]:
+            return res.json()
+        client_proxy.print_error(res.reason)
+        client_proxy.print_error(res.content.decode())
+        return None
+
+    def add_asset_permission_relations(self, permission_id, field, ids, org=None):
+        """ 通过关系接口为已存在的授权规则批量添加成员，不需要提交完整的成员列表
+
+        :param field: 成员字段 users/system_users/assets
+        :return: 是否成功
+        """
+        org = self.org if org is None else org
+        path, relation_field = ASSET_PERMISSION_RELATIONS[field]
+        url = self.generate_url(path)
+        data = [{'assetpermission': permission_id, relation_field: pk} for pk in ids]
+        res = self.request('post', url, data=data, org=org)
+        if res.status_code in [200, 201]:
+            return True
+        client_proxy.print_error(res.reason)
+        client_proxy.print_error(res.content.decode())
+        return False
+
+    def remove_asset_permission_relations(self, permission_id, field, ids, org=None):
+        """ 通过关系接口移除已存在的授权规则的成员
+
+        关系接口只支持按授权规则、成员精确过滤，不支持按成员列表批量删除，
+        因此先获取授权规则的全部关系，再按关系ID并发逐个删除
+
+        :param field: 成员字段 users/system_users/assets
+        :return: 是否成功
+        """
+        org = self.org if org is None else org
+        path, relation_field = ASSET_PERMISSION_RELATIONS[field]
+        url = self.generate_url(path)
+        ids = set(ids)
+        relations_id = [
+            relation['id'] for relation in self.iter_list(url, params={'assetpermission': permission_id}, org=org)
+            # 再次检查所属授权规则，服务端忽略过滤参数时也不会删除其他授权规则的成员
+            if relation.get('assetpermission') == permission_id and relation.get(relation_field) in ids
+        ]
+        if not relations_id:
+            return True
+        max_workers = max(1, min(config.requests_max_workers, len(relations_id)))
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            futures = [
+                submit_with_context(executor, self.remove_asset_permission_relation, url, relation_id, org)
+                for relation_id in relations_id
+            ]
+            results = [future.result() for future in futures]
+        return all(results)
+
+    def remove_asset_permission_relation(self, url, relation_id, org):
+        """ 按关系ID删除一条关系，关系已不存在 (404) 时视为成功 """
+        res = self.request('delete', '{}{}/'.format(url, relation_id), org=org)
+        if res.status_code in [200, 204, 404]:
+            return True
+        client_proxy.print_error(res.reason)
+        client_proxy.print_error(res.content.decode())
+        return False
+
+    def update_asset_permission_members(self, permission_id, members_add=None, members_remove=None, org=None):
+        """ 增量更新授权规则的成员，只提交需要添加、移除的部分
+
+        添加的成员数量超过 chunk_size 时分批提交
+
+        :param members_add: 需要添加的成员 {'users': [...], 'system_users': [...], 'assets': [...]}
+        :param members_remove: 需要移除的成员，格式同 members_add
+        :return: 是否成功
+        """
+        for field, ids in (members_add or {}).items():
+            step = config.permission_chunk_size or len(ids) or 1
+            for i in range(0, len(ids), step):
+                if not self.add_asset_permission_relations(permission_id, field, ids[i:i + step], org):
+                    return False
+        for field, ids in (members_remove or {}).items():
+            if ids and not self.remove_asset_permission_relations(permission_id, field, ids, org):
+                return False
+        return True
 
     def get_user_token(self, username, password):
         if not username or not password:
             client_proxy.print_error('username 或 password 不能为空')
             return None
 
-        session = requests.session()
+        session = self.session
+        request_kwargs = {
+            'verify': config.ssl_verify,
+            'timeout': config.requests_timeout
+        }
         auth_data = {
             'username': username,
             'password': password
         }
         auth_url = self.generate_url('/api/v1/authentication/tokens/')
-        res = session.post(auth_url, data=auth_data)
+        res = session.post(auth_url, data=auth_data, **request_kwargs)
         if res.status_code == 201:
             user_token_data = res.json()
-            logger.info(json.dumps(user_token_data, indent=4))
+            logger.debug('token: {}', user_token_data)
             return user_token_data
 
         if res.status_code == 200:
@@ -210,13 +859,13 @@ class ServerProxy:
                 mfa_data = {
                     'code': mfa_code
                 }
-                res = session.post(mfa_url, data=mfa_data)
+                res = session.post(mfa_url, data=mfa_data, **request_kwargs)
 
                 if res.status_code == 200:
-                    res = session.post(auth_url, data=auth_data)
+                    res = session.post(auth_url, data=auth_data, **request_kwargs)
                     if res.status_code == 201:
                         user_token_data = res.json()
-                        logger.info(json.dumps(user_token_data, indent=4))
+                        logger.debug('token: {}', user_token_data)
                         return user_token_data
                     else:
                         client_proxy.print_error(res.content.decode())
@@ -244,6 +893,271 @@ class ServerProxy:
             return False, res.reason
 
 
+class AsyncResponse:
+    """ 异步请求的响应 - 与 requests.Response 常用的属性保持一致 """
+
+    def __init__(self, status_code, reason, headers, content):
+        self.status_code = status_code
+        self.reason = reason
+        self.headers = headers
+        self.content = content
+
+    def json(self):
+        return json.loads(self.content)
+
+
+class AsyncServerProxy(BaseServerProxy):
+    """ 异步服务代理者 - 基于 aiohttp 与 JumpServer 进行交互
+
+    与 ServerProxy 提供相同的方法 (均为协程)，所有请求共用一个连接器，
+    并发请求数由 async_max_concurrency 限制，适用于在单个线程中发起大量查询
+
+    使用方式:
+        async with AsyncServerProxy() as proxy:
+            proxy.set_org(org)
+            assets, hostnames_missing = await proxy.get_assets(hostnames)
+    """
+
+    def __init__(self, memo=None, cache=None, stats=None):
+        assert aiohttp is not None, 'AsyncServerProxy requires `aiohttp`, please `pip install aiohttp`'
+        super().__init__(memo=memo, cache=cache, stats=stats)
+        self.session = None
+        self.semaphore = None
+        self.signer = None
+        if config.authentication_type_is_api_key():
+            self.signer = self.generate_http_signer()
+
+    async def open(self):
+        connector = aiohttp.TCPConnector(
+            limit=config.requests_async_max_concurrency,
+            ssl=None if config.ssl_verify else False,
+            force_close=not config.requests_keep_alive
+        )
+        timeout = aiohttp.ClientTimeout(total=config.requests_timeout)
+        # 默认的 CookieJar 不接受 IP 地址服务端的 Cookie，MFA 认证需要保持会话 Cookie
+        cookie_jar = aiohttp.CookieJar(unsafe=True)
+        self.session = aiohttp.ClientSession(connector=connector, timeout=timeout, cookie_jar=cookie_jar)
+        self.semaphore = asyncio.Semaphore(config.requests_async_max_concurrency)
+
+    async def close(self):
+        if self.session is not None:
+            await self.session.close()
+            self.session = None
+
+    async def __aenter__(self):
+        await self.open()
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.close()
+
+    async def request(self, method, url, data=None, params=None, org=None, retries=0):
+        assert method in ['get', 'post'], \
+            'method `{}` not allowed, must is `get` or `post`'.format(method)
+
+        if params:
+            url = '{}?{}'.format(url, urlencode(params))
+        headers = self.generate_http_headers(org)
+        if self.signer is not None:
+            parsed_url = urlparse(url)
+            path = parsed_url.path + ('?' + parsed_url.query if parsed_url.query else '')
+            headers = dict(self.signer.sign(
+                headers, host=parsed_url.netloc, method=method.upper(), path=path
+            ))
+
+        logger.info('向服务端发送异步请求: {} {}', method.upper(), url)
+
+        body = None
+        if method == 'post':
+            logger.debug('data: {}', data)
+            body = json.dumps(data)
+
+        async with self.semaphore:
+            start = time.perf_counter()
+            try:
+                async with self.session.request(method, url, data=body, headers=headers) as res:
+                    content = await res.read()
+            except (aiohttp.ClientError, asyncio.TimeoutError):
+                self.record_request(method, url, org, None, 0, time.perf_counter() - start, retries)
+                raise
+            self.record_request(method, url, org, res.status, len(content), time.perf_counter() - start, retries)
+            return AsyncResponse(res.status, res.reason, res.headers, content)
+
+    async def iter_list(self, url, params=None, org=None):
+        """ 使用 limit/offset 分页获取列表数据，按页逐个返回对象，任意一页请求失败时抛出 requests.HTTPError """
+        params = dict(params or {})
+        offset = 0
+        while True:
+            page_params = dict(params, limit=config.requests_page_size, offset=offset)
+            res = await self.request('get', url, params=page_params, org=org)
+            raise_for_list_response(res, url)
+            data = res.json()
+            if isinstance(data, list):
+                for obj in data:
+                    yield obj
+                return
+            results = data.get('results') or []
+            for obj in results:
+                yield obj
+            offset += len(results)
+            if not data.get('next') or len(results) == 0:
+                return
+
+    async def list_first(self, url, params, count, org=None):
+        objs = []
+        async for obj in self.iter_list(url, params=params, org=org):
+            objs.append(obj)
+            if len(objs) >= count:
+                break
+        return objs
+
+    async def lookup(self, object_type, key, fetch):
+        obj = self.get_cached(object_type, key)
+        if obj is not None:
+            return obj
+        obj = await fetch(key)
+        self.store_fetched(object_type, [key], [obj])
+        return obj
+
+    async def get_org(self, org_name):
+        return await self.lookup('org', org_name, self.fetch_org)
+
+    async def get_user(self, username):
+        return await self.lookup('user', username, self.fetch_user)
+
+    async def get_system_user(self, name):
+        return await self.lookup('system_user', name, self.fetch_system_user)
+
+    async def get_asset(self, hostname):
+        return await self.lookup('asset', hostname, self.fetch_asset)
+
+    async def fetch_org(self, org_name):
+        url = self.generate_url('/api/v1/orgs/orgs/')
+        async for org in self.iter_list(url):
+            if org['name'] == org_name:
+                return org
+        logger.error('组织 `{}` 不存在', org_name)
+        return None
+
+    async def fetch_user(self, username):
+        url = self.generate_url('/api/v1/users/users/')
+        users = await self.list_first(url, {'username': username}, 2)
+        return users[0] if len(users) == 1 else None
+
+    async def fetch_system_user(self, name):
+        url = self.generate_url('/api/v1/assets/system-users/')
+        system_users = await self.list_first(url, {'name': name}, 2)
+        return system_users[0] if len(system_users) == 1 else None
+
+    async def fetch_asset(self, hostname):
+        url = self.generate_url('/api/v1/assets/assets/')
+        assets = await self.list_first(url, {'hostname': hostname}, 2)
+        return assets[0] if len(assets) == 1 else None
+
+    async def get_assets_index(self):
+        """ 分页获取组织下的全部资产，并建立 hostname -> asset 的索引 """
+        org_id = self.get_org_id()
+        index = self.assets_indexes.get(org_id)
+        if index is not None:
+            return index
+        url = self.generate_url('/api/v1/assets/assets/')
+        index = {}
+        async for asset in self.iter_list(url):
+            self.add_to_assets_index(index, asset)
+        self.assets_indexes[org_id] = index
+        return index
+
+    async def get_assets(self, hostnames):
+        """ 获取多个资产，与 ServerProxy.get_assets 相同，超过 asset_bulk_lookup_threshold 时使用全量资产索引
+        :return: (按 hostnames 顺序排列的资产列表, 不存在的主机名列表)
+        """
+        assets_found, hostnames_remaining = self.partition_cached('asset', hostnames)
+        results = []
+        if self.use_assets_index(hostnames_remaining):
+            index = await self.get_assets_index()
+            results = [index.get(hostname) for hostname in hostnames_remaining]
+        elif hostnames_remaining:
+            results = await asyncio.gather(*[self.fetch_asset(hostname) for hostname in hostnames_remaining])
+        assets_found.update(self.store_fetched('asset', hostnames_remaining, results))
+        return self.order_by_keys(hostnames, assets_found)
+
+    async def get_asset_permission(self, name, org=None):
+        """ 根据名称获取授权规则 (不使用缓存) """
+        org = self.org if org is None else org
+        url = self.generate_url('/api/v1/perms/asset-permissions/')
+        permissions = await self.list_first(url, {'name': name}, 2, org=org)
+        return permissions[0] if len(permissions) == 1 else None
+
+    async def create_asset_permission(self, data, org=None):
+        """ 创建授权规则，服务端返回 429/502/503/504 时按指数退避重试 """
+        org = self.org if org is None else org
+        url = self.generate_url('/api/v1/perms/asset-permissions/')
+        retries = 0
+        while True:
+            res = await self.request('post', url, data=data, org=org, retries=retries)
+            delay = self.get_create_retry_delay(res, retries, data.get('name'))
+            if delay is None:
+                break
+            retries += 1
+            await asyncio.sleep(delay)
+
+        if res.status_code in [200, 201]:
+            return res.json()
+        if retries > 0 and res.status_code == 400:
+            permission = await self.get_asset_permission(data['name'], org)
+            if self.is_created_by_previous_attempt(permission, data):
+                return permission
+        self.handle_create_failure(res, org)
+        return None
+
+    async def get_user_token(self, username, password):
+        if not username or not password:
+            client_proxy.print_error('username 或 password 不能为空')
+            return None
+
+        auth_data = {
+            'username': username,
+            'password': password
+        }
+        auth_url = self.generate_url('/api/v1/authentication/tokens/')
+        res = await self.post_form(auth_url, auth_data)
+        if res.status_code == 200 and res.json().get('error') == 'mfa_required':
+            while True:
+                mfa_code = client_proxy.input_login_mfa_code()
+                if len(mfa_code) != 6 or not mfa_code.isdigit():
+                    client_proxy.print_error('MFA code 输入有误，请输入6位数字...')
+                    continue
+                break
+            mfa_url = self.generate_url('/api/v1/authentication/mfa/challenge/')
+            res = await self.post_form(mfa_url, {'code': mfa_code})
+            if res.status_code == 200:
+                res = await self.post_form(auth_url, auth_data)
+
+        if res.status_code == 201:
+            user_token_data = res.json()
+            logger.debug('token: {}', user_token_data)
+            return user_token_data
+        client_proxy.print_error(res.content.decode())
+        return None
+
+    async def post_form(self, url, data):
+        async with self.session.post(url, data=data) as res:
+            content = await res.read()
+            return AsyncResponse(res.status, res.reason, res.headers, content)
+
+    async def test_connectivity(self):
+        logger.info('测试服务可连接性')
+        self.set_org({'name': 'DEFAULT', 'id': ''})
+        url = self.generate_url('/api/health/')
+        res = await self.request('get', url)
+        if res.status_code == 200:
+            logger.info('测试服务可连接性...成功')
+            return True, None
+        else:
+            logger.error(res.content.decode())
+            return False, res.reason
+
+
 class ClientProxy:
     """ 客户端代理者 - 负责与用户行为进行交互"""
 
@@ -272,11 +1186,13 @@ class ClientProxy:
 
     def input_asset_source(self):
         while True:
-            opt = self.input("资产数据来源: 1.csv 2.手动输入; -- 请选择: ")
+            opt = self.input("资产数据来源: 1.csv 2.手动输入 3.主机名文件(每行一个); -- 请选择: ")
             if opt == '1':
                 return 'csv'
             elif opt == '2':
                 return 'manual'
+            elif opt == '3':
+                return 'file'
             else:
                 continue
 
@@ -295,6 +1211,16 @@ class ClientProxy:
             break
         return opt
 
+    def input_asset_source_hostname_file_path(self):
+        while True:
+            opt = self.input('输入授权资产的主机名文件路径: ')
+            if not os.path.isfile(opt):
+                msg = '`{}` is not a file'.format(opt)
+                self.print_error(msg)
+                continue
+            break
+        return opt
+
     def input_asset_hostname(self):
         opt = self.input('输入授权资产的主机名: ')
         return opt
@@ -364,6 +1290,20 @@ class ClientProxy:
         '''.format(len(permissions_created), permissions_name)
         client_proxy.print(msg)
 
+    def print_request_stats_display(self, summary):
+        self.print_info('本次脚本执行的请求统计如下 (耗时单位: ms, 总用时: {}s): '.format(summary['elapsed_s']))
+        row = '{:<45} {:>7} {:>6} {:>12} {:>10} {:>8} {:>8} {:>8} {:>10}'
+        self.print(row.format('接口', '请求数', '错误数', '响应字节', '总耗时', '平均', 'p50', 'p95', '最大'))
+        for endpoint, stats in summary['endpoints'].items():
+            self.print(row.format(
+                endpoint, stats['count'], stats['errors'], stats['bytes'],
+                '{:.0f}'.format(stats['latency_ms_total']),
+                '{:.1f}'.format(stats['latency_ms_avg']),
+                '<={}'.format(stats['latency_ms_p50']),
+                '<={}'.format(stats['latency_ms_p95']),
+                '{:.1f}'.format(stats['latency_ms_max'])
+            ))
+
     def quit(self, msg=None):
         if msg:
             self.print_info(msg)
@@ -371,25 +1311,333 @@ class ClientProxy:
         sys.exit(0)
 
 
-class Logger:
+class RequestStats:
+    """ 请求统计 - 按接口累计请求数、错误数、响应大小及耗时分布 """
+
+    # 耗时分布的区间上限 (毫秒)
+    LATENCY_BUCKETS = [5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000, float('inf')]
+    ID_PATTERN = re.compile(r'/[0-9a-fA-F-]{32,36}/|/\d+/')
+
     def __init__(self):
-        self.file = open(config.log_file_path, 'a')
+        self.lock = threading.Lock()
+        self.endpoints = {}
+        self.start_time = time.time()
+
+    def get_endpoint(self, method, path):
+        """ 将路径中的对象ID替换为 {id}，同一接口的请求合并统计 """
+        path = self.ID_PATTERN.sub('/{id}/', path)
+        path = path.replace('/api/v1', '', 1)
+        return '{} {}'.format(method.upper(), path)
+
+    def record(self, method, path, status, size, latency):
+        endpoint = self.get_endpoint(method, path)
+        latency_ms = latency * 1000
+        with self.lock:
+            stats = self.endpoints.get(endpoint)
+            if stats is None:
+                stats = {
+                    'count': 0,
+                    'errors': 0,
+                    'bytes': 0,
+                    'latency_ms_total': 0.0,
+                    'latency_ms_max': 0.0,
+                    'histogram': [0] * len(self.LATENCY_BUCKETS)
+                }
+                self.endpoints[endpoint] = stats
+            stats['count'] += 1
+            if status is None or status >= 400:
+                stats['errors'] += 1
+            stats['bytes'] += size
+            stats['latency_ms_total'] += latency_ms
+            stats['latency_ms_max'] = max(stats['latency_ms_max'], latency_ms)
+            for index, bucket in enumerate(self.LATENCY_BUCKETS):
+                if latency_ms <= bucket:
+                    stats['histogram'][index] += 1
+                    break
 
-    def write(self, msg):
-        self.file.write('[{}] {} \n'.format(datetime.datetime.now(), msg))
-        self.file.flush()
+    def get_percentile(self, stats, percentile):
+        """ 根据耗时分布估算百分位耗时 (取所在区间的上限，最后一个区间取最大耗时) """
+        threshold = stats['count'] * percentile / 100
+        total = 0
+        for bucket, bucket_count in zip(self.LATENCY_BUCKETS[:-1], stats['histogram']):
+            total += bucket_count
+            if total >= threshold:
+                return bucket
+        return round(stats['latency_ms_max'], 3)
+
+    def get_summary(self):
+        with self.lock:
+            endpoints = {endpoint: dict(stats, histogram=list(stats['histogram']))
+                         for endpoint, stats in self.endpoints.items()}
+        summary = {
+            'elapsed_s': round(time.time() - self.start_time, 3),
+            'endpoints': {}
+        }
+        for endpoint, stats in sorted(endpoints.items(), key=lambda item: -item[1]['latency_ms_total']):
+            count = stats['count']
+            summary['endpoints'][endpoint] = {
+                'count': count,
+                'errors': stats['errors'],
+                'bytes': stats['bytes'],
+                'latency_ms_total': round(stats['latency_ms_total'], 3),
+                'latency_ms_avg': round(stats['latency_ms_total'] / count, 3),
+                'latency_ms_p50': self.get_percentile(stats, 50),
+                'latency_ms_p95': self.get_percentile(stats, 95),
+                'latency_ms_p99': self.get_percentile(stats, 99),
+                'latency_ms_max': round(stats['latency_ms_max'], 3),
+                'histogram': dict(zip(
+                    ['<={}'.format(bucket) for bucket in self.LATENCY_BUCKETS], stats['histogram']
+                ))
+            }
+        return summary
+
+
+class LRUCache:
+    """ 内存缓存 - 在单次脚本执行中缓存查询结果，超出容量时淘汰最久未使用的记录 """
+
+    def __init__(self, maxsize):
+        self.maxsize = maxsize
+        self.data = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        with self.lock:
+            if key not in self.data:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self.data.move_to_end(key)
+            return self.data[key]
 
-    def info(self, msg):
-        self.write('[INFO] {}'.format(msg))
+    def set(self, key, value):
+        with self.lock:
+            self.data[key] = value
+            self.data.move_to_end(key)
+            while len(self.data) > self.maxsize:
+                self.data.popitem(last=False)
 
-    def debug(self, msg):
-        self.write('[DEBUG] {}'.format(msg))
+    def delete(self, key):
+        with self.lock:
+            self.data.pop(key, None)
 
-    def error(self, msg):
-        self.write('[ERROR] {}'.format(msg))
+    def clear(self):
+        with self.lock:
+            self.data.clear()
 
-    def __delete__(self, instance):
-        instance.file.close()
+    def clear_org(self, org_id):
+        """ 删除组织的记录 (键的第一项为组织ID) """
+        with self.lock:
+            for key in [key for key in self.data if key[0] == org_id]:
+                del self.data[key]
+
+
+class LookupCache:
+    """ 本地查询缓存 - 将组织、用户、系统用户、资产的查询结果保存在 SQLite 文件中
+
+    缓存以 服务地址 + 组织ID + 对象类型 + 查询条件 为键，超过 ttl 秒的记录视为过期
+    """
+
+    def __init__(self, file_path, ttl):
+        self.ttl = ttl
+        self.server = config.server
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(file_path, check_same_thread=False)
+        self.conn.execute(
+            'CREATE TABLE IF NOT EXISTS lookup_cache ('
+            'server TEXT, org_id TEXT, object_type TEXT, lookup_key TEXT, '
+            'value TEXT, created_at REAL, '
+            'PRIMARY KEY (server, org_id, object_type, lookup_key))'
+        )
+        self.conn.commit()
+
+    def get(self, org_id, object_type, key):
+        with self.lock:
+            row = self.conn.execute(
+                'SELECT value, created_at FROM lookup_cache '
+                'WHERE server=? AND org_id=? AND object_type=? AND lookup_key=?',
+                (self.server, org_id, object_type, key)
+            ).fetchone()
+        if row is None:
+            return None
+        value, created_at = row
+        if time.time() - created_at > self.ttl:
+            self.delete(org_id, object_type, key)
+            return None
+        return json.loads(value)
+
+    def get_many(self, org_id, object_type, keys):
+        """ 批量查询，每 LOOKUP_CACHE_BATCH_SIZE 个键一次 IN (...) 查询
+        :return: 未过期的记录 {key: obj}
+        """
+        keys = list(keys)
+        rows = []
+        with self.lock:
+            for i in range(0, len(keys), LOOKUP_CACHE_BATCH_SIZE):
+                batch = keys[i:i + LOOKUP_CACHE_BATCH_SIZE]
+                rows.extend(self.conn.execute(
+                    'SELECT lookup_key, value, created_at FROM lookup_cache '
+                    'WHERE server=? AND org_id=? AND object_type=? AND lookup_key IN ({})'.format(
+                        ','.join('?' * len(batch))
+                    ),
+                    [self.server, org_id, object_type] + batch
+                ).fetchall())
+        objs = {}
+        keys_expired = []
+        now = time.time()
+        for key, value, created_at in rows:
+            if now - created_at > self.ttl:
+                keys_expired.append(key)
+            else:
+                objs[key] = json.loads(value)
+        if keys_expired:
+            self.delete_many(org_id, object_type, keys_expired)
+        return objs
+
+    def set(self, org_id, object_type, key, obj):
+        with self.lock:
+            self.conn.execute(
+                'INSERT OR REPLACE INTO lookup_cache VALUES (?, ?, ?, ?, ?, ?)',
+                (self.server, org_id, object_type, key, json.dumps(obj), time.time())
+            )
+            self.conn.commit()
+
+    def set_many(self, org_id, object_type, objs):
+        """ 批量写入 {key: obj}，在一个事务中提交 """
+        now = time.time()
+        rows = [
+            (self.server, org_id, object_type, key, json.dumps(obj), now)
+            for key, obj in objs.items()
+        ]
+        with self.lock:
+            with self.conn:
+                self.conn.executemany('INSERT OR REPLACE INTO lookup_cache VALUES (?, ?, ?, ?, ?, ?)', rows)
+
+    def delete(self, org_id, object_type, key):
+        with self.lock:
+            self.conn.execute(
+                'DELETE FROM lookup_cache '
+                'WHERE server=? AND org_id=? AND object_type=? AND lookup_key=?',
+                (self.server, org_id, object_type, key)
+            )
+            self.conn.commit()
+
+    def delete_many(self, org_id, object_type, keys):
+        rows = [(self.server, org_id, object_type, key) for key in keys]
+        with self.lock:
+            with self.conn:
+                self.conn.executemany(
+                    'DELETE FROM lookup_cache '
+                    'WHERE server=? AND org_id=? AND object_type=? AND lookup_key=?',
+                    rows
+                )
+
+    def clear_org(self, org_id):
+        with self.lock:
+            self.conn.execute(
+                'DELETE FROM lookup_cache WHERE server=? AND org_id=?',
+                (self.server, org_id)
+            )
+            self.conn.commit()
+
+    def close(self):
+        self.conn.close()
+
+
+class Logger:
+    """ 日志记录者
+
+    * 低于配置级别的日志直接丢弃，不做格式化 (使用 logger.info('x: {}', x) 的方式传参)
+    * 列表、字典等参数只格式化前若干项，超长的日志截断为 max_message_length
+    * 日志由后台线程批量写入文件，文件超过 max_bytes 时切割，保留 backup_count 个备份
+    """
+
+    LEVELS = {'DEBUG': 10, 'INFO': 20, 'ERROR': 40}
+
+    def __init__(self, file_path=None):
+        self.file_path = file_path or config.log_file_path
+        self.level = self.LEVELS.get(str(config.log_level).upper(), self.LEVELS['INFO'])
+        self.max_bytes = config.log_max_bytes
+        self.backup_count = config.log_backup_count
+        self.max_message_length = config.log_max_message_length
+        self.repr = reprlib.Repr()
+        self.repr.maxlist = self.repr.maxtuple = self.repr.maxset = self.repr.maxdict = 20
+        self.repr.maxstring = self.repr.maxother = self.max_message_length
+        self.repr.maxlevel = 4
+        self.file = open(self.file_path, 'a')
+        self.queue = queue.Queue()
+        self.closed = False
+        self.writer = threading.Thread(target=self.run_writer, daemon=True)
+        self.writer.start()
+        atexit.register(self.close)
+
+    def is_enabled_for(self, level):
+        return self.LEVELS[level] >= self.level
+
+    def format_arg(self, arg):
+        if isinstance(arg, (list, tuple, set, dict)):
+            return self.repr.repr(arg)
+        return arg
+
+    def log(self, level, msg, *args):
+        if not self.is_enabled_for(level):
+            return
+        msg = str(msg)
+        if args:
+            msg = msg.format(*[self.format_arg(arg) for arg in args])
+        if len(msg) > self.max_message_length:
+            msg = '{}... (truncated, {} chars)'.format(msg[:self.max_message_length], len(msg))
+        self.write('[{}] [{}] {} \n'.format(datetime.datetime.now(), level, msg))
+
+    def write(self, line):
+        """ 将一行日志交给后台线程写入 """
+        self.queue.put(line)
+
+    def info(self, msg, *args):
+        self.log('INFO', msg, *args)
+
+    def debug(self, msg, *args):
+        self.log('DEBUG', msg, *args)
+
+    def error(self, msg, *args):
+        self.log('ERROR', msg, *args)
+
+    def run_writer(self):
+        stop = False
+        while not stop:
+            lines = [self.queue.get()]
+            while True:
+                try:
+                    lines.append(self.queue.get_nowait())
+                except queue.Empty:
+                    break
+            if None in lines:
+                stop = True
+                lines = [line for line in lines if line is not None]
+            self.file.write(''.join(lines))
+            self.file.flush()
+            self.rotate()
+
+    def rotate(self):
+        if not self.max_bytes or self.file.tell() < self.max_bytes:
+            return
+        self.file.close()
+        if self.backup_count > 0:
+            for index in range(self.backup_count - 1, 0, -1):
+                src = '{}.{}'.format(self.file_path, index)
+                if os.path.exists(src):
+                    os.replace(src, '{}.{}'.format(self.file_path, index + 1))
+            os.replace(self.file_path, '{}.1'.format(self.file_path))
+        self.file = open(self.file_path, 'w')
+
+    def close(self):
+        if self.closed:
+            return
+        self.closed = True
+        self.queue.put(None)
+        self.writer.join()
+        self.file.close()
 
 
 def before_creation():
@@ -429,22 +1677,30 @@ def before_creation():
 class AssetPermissionDataOperator:
     """
     对用户输入的数据以及从服务端获取回来的数据进行方便存取
+
+    用户、系统用户、资产以 id 为键保存在字典中 (保持添加顺序)，添加时去重为 O(1)
     """
 
+    __slots__ = ('name', 'users', 'assets', 'system_users', 'org', 'actions')
+
     def __init__(self):
         self.name = ''
-        self.users = []
-        self.assets = []
-        self.system_users = []
+        self.users = {}
+        self.assets = {}
+        self.system_users = {}
         self.org = None
+        self.actions = None
 
     def get_asset_permission_data(self):
-        return {
+        data = {
             'name': self.name,
             'users': self.get_users_id(),
             'system_users': self.get_system_users_id(),
             'assets': self.get_assets_id()
         }
+        if self.actions:
+            data['actions'] = self.actions
+        return data
 
     def get_asset_permission_data_display(self):
         return {
@@ -458,17 +1714,18 @@ class AssetPermissionDataOperator:
     def set_name(self, name):
         self.name = name
 
+    def set_actions(self, actions):
+        self.actions = actions
+
     # user
     def get_users_username(self):
-        return [user['username'] for user in self.users]
+        return [user['username'] for user in self.users.values()]
 
     def get_users_id(self):
-        return [user['id'] for user in self.users]
+        return list(self.users)
 
     def add_user(self, user):
-        users_id = self.get_users_id()
-        if user['id'] not in users_id:
-            self.users.append(user)
+        self.users.setdefault(user['id'], user)
 
     def add_users(self, users):
         for user in users:
@@ -476,15 +1733,13 @@ class AssetPermissionDataOperator:
 
     # asset
     def get_assets_id(self):
-        return [asset['id'] for asset in self.assets]
+        return list(self.assets)
 
     def get_assets_hostname(self):
-        return [asset['hostname'] for asset in self.assets]
+        return [asset['hostname'] for asset in self.assets.values()]
 
     def add_asset(self, asset):
-        assets_id = self.get_assets_id()
-        if asset['id'] not in assets_id:
-            self.assets.append(asset)
+        self.assets.setdefault(asset['id'], asset)
 
     def add_assets(self, assets):
         for asset in assets:
@@ -492,15 +1747,13 @@ class AssetPermissionDataOperator:
 
     # system user
     def get_system_users_id(self):
-        return [system_user['id'] for system_user in self.system_users]
+        return list(self.system_users)
 
     def get_system_users_name(self):
-        return [system_user['name'] for system_user in self.system_users]
+        return [system_user['name'] for system_user in self.system_users.values()]
 
     def add_system_user(self, system_user):
-        system_users_id = self.get_system_users_id()
-        if system_user['id'] not in system_users_id:
-            self.system_users.append(system_user)
+        self.system_users.setdefault(system_user['id'], system_user)
 
     def add_system_users(self, system_users):
         for system_user in system_users:
@@ -514,6 +1767,196 @@ class AssetPermissionDataOperator:
         return self.org['name']
 
 
+def sync_asset_permission(data, org=None):
+    """ 同步模式: 与服务端已存在的授权规则比较，只创建或更新有变化的部分，重复执行不会产生重复的授权规则
+
+    * 同名授权规则已存在: 成员有变化时通过关系接口只添加/移除变化的成员，动作有变化时只更新动作，否则跳过
+    * 不存在同名授权规则，但存在成员完全相同的授权规则: 跳过
+    * 都不存在: 创建 (按 chunk_size 分块)
+    split 模式下拆分后的每条授权规则分别比较
+
+    :return: (授权规则列表, 错误信息列表, 状态 created/updated/unchanged)
+    """
+    org = server_proxy.org if org is None else org
+    index = server_proxy.get_asset_permissions_index(org)
+    chunk_size = config.permission_chunk_size
+    if chunk_size and config.permission_chunk_mode == 'split' and len(data['assets']) > chunk_size:
+        items_data = split_asset_permission_data(data, chunk_size)
+    else:
+        items_data = [data]
+
+    permissions = []
+    errors = []
+    statuses = set()
+    for item_data in items_data:
+        # 同一组织中同名或成员相同的授权规则串行比较及创建，避免并发执行时重复创建；固定先成员后名称的加锁顺序
+        with server_proxy.get_asset_permission_lock(org, ('members', get_asset_permission_members(item_data))), \
+                server_proxy.get_asset_permission_lock(org, ('name', item_data['name'])):
+            item_permissions, item_errors, status = sync_asset_permission_item(index, item_data, org)
+        permissions.extend(item_permissions)
+        errors.extend(item_errors)
+        if status is not None:
+            statuses.add(status)
+
+    for status in ['created', 'updated', 'unchanged']:
+        if status in statuses:
+            return permissions, errors, status
+    return permissions, errors, 'failed'
+
+
+def sync_asset_permission_item(index, item_data, org):
+    """ 同步一条授权规则 (split 模式下拆分后的一条)，调用方需持有该授权规则名称及成员对应的锁
+
+    :return: (授权规则列表, 错误信息列表, 状态 created/updated/unchanged，失败时为 None)
+    """
+    permission = index['names'].get(item_data['name'])
+    if permission is None:
+        permission = index['members'].get(get_asset_permission_members(item_data))
+        if permission is not None:
+            logger.info('授权规则 `{}` 与已存在的 `{}` 成员相同，跳过', item_data['name'], permission['name'])
+            return [permission], [], 'unchanged'
+        permissions_created, errors_created = create_asset_permissions_chunked(item_data, org)
+        for permission_created in permissions_created:
+            index['names'][permission_created['name']] = permission_created
+            index['members'].setdefault(get_asset_permission_members(permission_created), permission_created)
+        return permissions_created, errors_created, 'created'
+
+    members_add = {}
+    members_remove = {}
+    for field in ASSET_PERMISSION_RELATIONS:
+        members = set(permission.get(field) or [])
+        members_desired = set(item_data[field])
+        ids_add = [pk for pk in item_data[field] if pk not in members]
+        ids_remove = [pk for pk in permission.get(field) or [] if pk not in members_desired]
+        if ids_add:
+            members_add[field] = ids_add
+        if ids_remove:
+            members_remove[field] = ids_remove
+    actions_changed = 'actions' in item_data and set(item_data['actions']) != set(permission.get('actions') or [])
+    if not members_add and not members_remove and not actions_changed:
+        logger.info('授权规则 `{}` 没有变化，跳过', item_data['name'])
+        return [permission], [], 'unchanged'
+
+    logger.info(
+        '更新授权规则 `{}`: 添加 {}, 移除 {}, 更新动作: {}', item_data['name'],
+        {field: len(ids) for field, ids in members_add.items()},
+        {field: len(ids) for field, ids in members_remove.items()}, actions_changed
+    )
+    permission_updated = dict(permission, **{field: item_data[field] for field in ASSET_PERMISSION_RELATIONS})
+    if members_add or members_remove:
+        if not server_proxy.update_asset_permission_members(permission['id'], members_add, members_remove, org):
+            return [], ['更新授权规则 `{}` 的成员失败'.format(item_data['name'])], None
+    if actions_changed:
+        permission_updated = server_proxy.update_asset_permission(
+            permission['id'], {'actions': item_data['actions']}, org
+        )
+        if permission_updated is None:
+            return [], ['更新授权规则 `{}` 的动作失败'.format(item_data['name'])], None
+    members_old = get_asset_permission_members(permission)
+    if index['members'].get(members_old) is permission:
+        index['members'].pop(members_old)
+    index['names'][permission_updated['name']] = permission_updated
+    index['members'].setdefault(get_asset_permission_members(permission_updated), permission_updated)
+    return [permission_updated], [], 'updated'
+
+
+def resolve_org(org_name):
+    """ 根据组织名称获取组织，`DEFAULT` 组织无需请求服务端
+    :return: 组织 或 None
+    """
+    if org_name.upper() == 'DEFAULT':
+        return {'name': org_name.upper(), 'id': ''}
+    return server_proxy.get_org(org_name)
+
+
+def iter_csv_hostnames(file_path):
+    """ 逐行读取csv文件中的资产主机名 (不会一次性读入整个文件)
+
+    * 默认使用 utf-8-sig 编码，自动去除 BOM，可通过 assets_csv.encoding 修改
+    * 第一行为表头，主机名所在的列由 assets_csv.hostname_column 指定；
+      只有一列时直接使用该列
+    * 忽略空行及空的主机名
+
+    :return: 主机名生成器
+    """
+    with open(file_path, 'r', encoding=config.assets_csv_encoding, newline='') as f:
+        rows = csv.reader(f)
+        header = next(rows, None)
+        if header is None:
+            return
+        columns = [column.strip().lower() for column in header]
+        column_name = config.assets_csv_hostname_column.strip().lower()
+        if column_name in columns:
+            column_index = columns.index(column_name)
+        elif len(columns) == 1:
+            column_index = 0
+        else:
+            raise ValueError('表头中没有 `{}` 列: {}'.format(config.assets_csv_hostname_column, header))
+        for row in rows:
+            if len(row) <= column_index:
+                continue
+            hostname = row[column_index].strip()
+            if hostname:
+                yield hostname
+
+
+MMAP_CHUNK_SIZE = 8 * 1024 * 1024
+
+
+def iter_mmap_hostnames(file_path):
+    """ 读取每行一个主机名的纯文本文件，适用于数百万行的大文件
+
+    * 使用 mmap 映射文件，按块 (8MB) 整体切分行，不逐行经过 csv 解析
+    * 主机名在解码前使用 bytes 集合去重，只返回第一次出现的主机名
+    * 忽略 BOM、空行及行首尾的空白字符
+
+    :return: 去重后的主机名生成器
+    """
+    seen = set()
+    with open(file_path, 'rb') as f:
+        size = os.fstat(f.fileno()).st_size
+        if size == 0:
+            return
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            start = 3 if mm[:3] == b'\xef\xbb\xbf' else 0
+            tail = b''
+            while start < size:
+                end = min(start + MMAP_CHUNK_SIZE, size)
+                lines = (tail + mm[start:end]).split(b'\n')
+                tail = lines.pop() if end < size else b''
+                start = end
+                for line in dict.fromkeys(lines):
+                    line = line.strip()
+                    if not line or line in seen:
+                        continue
+                    seen.add(line)
+                    yield line.decode('utf-8')
+
+
+def get_assets_in_batches(assets_hostname):
+    """ 按 assets_csv.batch_size 分批获取资产，assets_hostname 可以是生成器
+
+    是否使用全量资产索引按整个数据来源的主机名数量判断一次 (只需预读 asset_bulk_lookup_threshold + 1 个)，
+    不按每批的数量判断，否则 batch_size 不超过阈值时大文件会逐个查询每个资产
+
+    :return: (资产列表, 不存在的主机名列表)
+    """
+    assets = []
+    assets_hostname_missing = []
+    assets_hostname = iter(assets_hostname)
+    head = list(itertools.islice(assets_hostname, config.requests_asset_bulk_lookup_threshold + 1))
+    use_index = server_proxy.use_assets_index(head)
+    assets_hostname = itertools.chain(head, assets_hostname)
+    while True:
+        batch = list(itertools.islice(assets_hostname, config.assets_csv_batch_size))
+        if not batch:
+            break
+        batch_assets, batch_missing = server_proxy.get_assets(batch, use_index=use_index)
+        assets.extend(batch_assets)
+        assets_hostname_missing.extend(batch_missing)
+    return assets, assets_hostname_missing
+
+
 def create():
     """ 创建授权规则
 
@@ -531,18 +1974,22 @@ def create():
     :return: 创建成功的资产授权规则信息, dict
     """
 
+    correlation_id = new_correlation_id()
+    logger.info('开始创建授权规则, 关联ID: {}', correlation_id)
+
     data_operator = AssetPermissionDataOperator()
 
     # org
     while True:
         org_name = client_proxy.input_org_name()
-        if org_name.upper() == 'DEFAULT':
-            org = {'name': org_name.upper(), 'id': ''}
-        else:
-            org = server_proxy.get_org(org_name)
-            if org is None:
-                client_proxy.print_error('组织 `{}` 不存在'.format(org_name))
-                continue
+        try:
+            org = resolve_org(org_name)
+        except requests.RequestException as exc:
+            client_proxy.print_error('获取组织失败: {}'.format(exc))
+            continue
+        if org is None:
+            client_proxy.print_error('组织 `{}` 不存在'.format(org_name))
+            continue
         data_operator.set_org(org)
         server_proxy.set_org(org)
         break
@@ -555,7 +2002,11 @@ def create():
     users = []
     while True:
         user_username = client_proxy.input_user_username()
-        user = server_proxy.get_user(user_username)
+        try:
+            user = server_proxy.get_user(user_username)
+        except requests.RequestException as exc:
+            client_proxy.print_error('获取用户失败: {}'.format(exc))
+            continue
         if user is None:
             client_proxy.print_error('用户`{}` 不存在'.format(user_username))
             continue
@@ -571,7 +2022,11 @@ def create():
     system_users = []
     while True:
         system_user_name = client_proxy.input_system_user_name()
-        system_user = server_proxy.get_system_user(system_user_name)
+        try:
+            system_user = server_proxy.get_system_user(system_user_name)
+        except requests.RequestException as exc:
+            client_proxy.print_error('获取系统用户失败: {}'.format(exc))
+            continue
         if system_user is None:
             client_proxy.print_error('系统用户 `{}` 不存在'.format(system_user_name))
             continue
@@ -586,25 +2041,28 @@ def create():
     # assets
     assets = []
     assets_source = client_proxy.input_asset_source()
-    if assets_source.lower() == 'csv':
-        # read csv file
+    if assets_source.lower() in ['csv', 'file']:
+        # read csv file / hostname file
         while True:
-            csv_file_path = client_proxy.input_asset_source_csv_file_path()
-            assets_hostname = []
-            with open(csv_file_path, 'r') as f:
-                rows = csv.reader(f)
-                for index, row in enumerate(rows):
-                    if index == 0:
-                        continue
-                    if len(row) == 1:
-                        assets_hostname.append(row[0])
+            if assets_source.lower() == 'csv':
+                file_path = client_proxy.input_asset_source_csv_file_path()
+                assets_hostname = iter_csv_hostnames(file_path)
+            else:
+                file_path = client_proxy.input_asset_source_hostname_file_path()
+                assets_hostname = iter_mmap_hostnames(file_path)
             # get assets
-            for asset_hostname in assets_hostname:
-                asset = server_proxy.get_asset(asset_hostname)
-                if asset is None:
-                    client_proxy.print_error('资产 `{}` 不存在'.format(asset_hostname))
-                else:
-                    assets.append(asset)
+            try:
+                assets, assets_hostname_missing = get_assets_in_batches(assets_hostname)
+            except (ValueError, UnicodeDecodeError, csv.Error) as exc:
+                client_proxy.print_error('读取文件失败: {}'.format(exc))
+                continue
+            except requests.RequestException as exc:
+                client_proxy.print_error('获取资产失败: {}'.format(exc))
+                continue
+            if assets_hostname_missing:
+                client_proxy.print_error('以下 {} 个资产不存在: {}'.format(
+                    len(assets_hostname_missing), assets_hostname_missing
+                ))
             if len(assets) == 0:
                 client_proxy.print_info('没有有效资产')
                 continue
@@ -616,7 +2074,11 @@ def create():
     else:
         while True:
             asset_hostname = client_proxy.input_asset_hostname()
-            asset = server_proxy.get_asset(asset_hostname)
+            try:
+                asset = server_proxy.get_asset(asset_hostname)
+            except requests.RequestException as exc:
+                client_proxy.print_error('获取资产失败: {}'.format(exc))
+                continue
             if asset is None:
                 client_proxy.print_error('资产 `{}` 不存在'.format(asset_hostname))
                 continue
@@ -635,18 +2097,113 @@ def create():
     # create asset permission
     if client_proxy.input_if_continue():
         data = data_operator.get_asset_permission_data()
-        permission = server_proxy.create_asset_permission(data)
-        if permission is None:
-            client_proxy.print_error('创建授权规则...失败')
+        if args.sync:
+            try:
+                permissions, errors, status = sync_asset_permission(data)
+            except requests.RequestException as exc:
+                permissions, errors, status = [], ['同步授权规则失败: {}'.format(exc)], 'failed'
+            client_proxy.print_info('同步结果: {}'.format(status))
         else:
+            try:
+                permissions, errors = create_asset_permissions_chunked(data)
+            except requests.RequestException as exc:
+                permissions, errors = [], ['请求失败: {}'.format(exc)]
+        for error in errors:
+            client_proxy.print_error(error)
+        if errors:
+            client_proxy.print_error('创建授权规则...失败')
+        for permission in permissions:
             json_data = json.dumps(permission, indent=4)
             client_proxy.print(json_data)
+        if permissions and not errors:
             client_proxy.print_info('创建资产授权规则...成功')
     else:
-        permission = None
+        permissions = []
         client_proxy.print_info('取消创建授权规则')
 
-    return permission
+    return permissions
+
+
+ASSET_PERMISSION_MEMBER_FIELDS = ['users', 'user_groups', 'system_users', 'assets', 'nodes']
+
+
+def get_asset_permission_members(permission):
+    """ 授权规则的成员，用于比较两个授权规则是否授权了相同的对象 """
+    return tuple(frozenset(permission.get(field) or []) for field in ASSET_PERMISSION_MEMBER_FIELDS)
+
+
+def split_asset_permission_data(data, chunk_size):
+    """ 按 chunk_size 拆分授权规则的资产，名称追加 `-001`、`-002` 等后缀 """
+    assets_id = data['assets']
+    return [
+        dict(data, name='{}-{:03d}'.format(data['name'], index), assets=assets_id[offset:offset + chunk_size])
+        for index, offset in enumerate(range(0, len(assets_id), chunk_size), start=1)
+    ]
+
+
+def create_asset_permissions_chunked(data, org=None, skip_existing=False):
+    """ 创建授权规则，授权资产数量超过 chunk_size 时分块创建，避免单个请求过大
+
+    chunk_mode:
+    * split: 拆分为多条授权规则，名称追加 `-001`、`-002` 等后缀
+    * relation: 使用第一块资产创建授权规则，其余资产通过关系接口分批关联
+
+    :param data: 授权规则数据
+    :param org: 授权规则所属组织，默认为当前组织
+    :param skip_existing: 创建前检查同名授权规则是否已存在 (恢复中断的执行时使用)，
+        已存在时不再创建，只关联缺少的资产
+    :return: (创建的授权规则列表, 错误信息列表)
+    """
+    chunk_size = config.permission_chunk_size
+    assets_id = data['assets']
+    if not chunk_size or len(assets_id) <= chunk_size:
+        chunks = [assets_id]
+    else:
+        chunks = [assets_id[i:i + chunk_size] for i in range(0, len(assets_id), chunk_size)]
+        logger.info(
+            '授权规则 `{}` 的 {} 个资产分为 {} 块创建 ({})',
+            data['name'], len(assets_id), len(chunks), config.permission_chunk_mode
+        )
+
+    if len(chunks) > 1 and config.permission_chunk_mode == 'split':
+        permissions = []
+        errors = []
+        for chunk_data in split_asset_permission_data(data, chunk_size):
+            permission = None
+            if skip_existing:
+                permission = server_proxy.get_asset_permission(chunk_data['name'], org)
+            if permission is None:
+                permission = server_proxy.create_asset_permission(chunk_data, org)
+            if permission is None:
+                errors.append('创建授权规则 `{}` 失败'.format(chunk_data['name']))
+            else:
+                permissions.append(permission)
+        return permissions, errors
+
+    permission = None
+    if skip_existing:
+        permission = server_proxy.get_asset_permission(data['name'], org)
+    if permission is None:
+        permission = server_proxy.create_asset_permission(dict(data, assets=chunks[0]), org)
+        if permission is None:
+            return [], ['创建授权规则 `{}` 失败'.format(data['name'])]
+        chunks = chunks[1:]
+    else:
+        logger.info('授权规则 `{}` 已存在，只关联缺少的资产', data['name'])
+        assets_id_existing = set(permission['assets'])
+        assets_id_missing = [asset_id for asset_id in assets_id if asset_id not in assets_id_existing]
+        step = chunk_size or len(assets_id_missing) or 1
+        chunks = [assets_id_missing[i:i + step] for i in range(0, len(assets_id_missing), step)]
+
+    errors = []
+    assets_id_added = list(permission['assets'])
+    for chunk in chunks:
+        if server_proxy.add_asset_permission_relations(permission['id'], 'assets', chunk, org):
+            assets_id_added.extend(chunk)
+        else:
+            errors.append('授权规则 `{}` 关联 {} 个资产失败'.format(data['name'], len(chunk)))
+    permission['assets'] = assets_id_added
+    return [permission], errors
 
 
 def after_creation(permissions_created):
@@ -655,6 +2212,357 @@ def after_creation(permissions_created):
     :return:
     """
     client_proxy.print_asset_permissions_created_display(permissions_created)
+    client_proxy.print_info('查询缓存统计: 命中 {} 次, 未命中 {} 次'.format(
+        server_proxy.memo.hits, server_proxy.memo.misses
+    ))
+
+    summary = server_proxy.stats.get_summary()
+    client_proxy.print_request_stats_display(summary)
+    if args.stats_json:
+        with open(args.stats_json, 'w', encoding='utf-8') as f:
+            json.dump(summary, f, indent=4, ensure_ascii=False)
+        client_proxy.print_info('请求统计已写入: {}'.format(args.stats_json))
+
+
+MANIFEST_LIST_FIELDS = ['users', 'system_users', 'assets', 'actions']
+
+
+def load_manifest(file_path):
+    """ 读取授权规则清单文件
+
+    支持的格式:
+    * .yml/.yaml: `permissions` 列表 (或顶层即为列表)
+    * .jsonl: 每行一条授权规则
+    * .csv: 表头为 org,name,users,system_users,assets,actions，列表字段使用 `;` 分隔
+
+    :return: 授权规则列表, list of dict
+    """
+    if file_path.endswith(('.yml', '.yaml')):
+        with open(file_path, 'rb') as f:
+            items = yaml.safe_load(f) or []
+        if isinstance(items, dict):
+            items = items.get('permissions') or []
+    elif file_path.endswith('.jsonl'):
+        with open(file_path, 'r', encoding='utf-8') as f:
+            items = [json.loads(line) for line in f if line.strip()]
+    elif file_path.endswith('.csv'):
+        with open(file_path, 'r', encoding='utf-8-sig', newline='') as f:
+            items = []
+            for row in csv.DictReader(f):
+                for field in MANIFEST_LIST_FIELDS:
+                    value = row.get(field) or ''
+                    row[field] = [v.strip() for v in value.split(';') if v.strip()]
+                items.append(row)
+    else:
+        raise ValueError('`{}` format is not `.yml`, `.jsonl` or `.csv`'.format(file_path))
+    return items
+
+
+def validate_manifest_item(item):
+    """ 校验清单中的一条授权规则
+    :return: 错误信息列表
+    """
+    errors = []
+    if not isinstance(item, dict):
+        return ['授权规则格式错误: {}'.format(item)]
+    if not item.get('name'):
+        errors.append('授权规则名称不能为空')
+    for field in ['users', 'system_users', 'assets']:
+        if not item.get(field):
+            errors.append('`{}` 不能为空'.format(field))
+    for field in MANIFEST_LIST_FIELDS:
+        if item.get(field) and not isinstance(item[field], list):
+            errors.append('`{}` 必须是列表'.format(field))
+    return errors
+
+
+def resolve_manifest_item(item):
+    """ 从服务端获取清单中一条授权规则引用的组织、用户、系统用户和资产
+
+    :return: (AssetPermissionDataOperator 或 None, 错误信息列表)
+    """
+    try:
+        return resolve_manifest_item_objects(item)
+    except requests.RequestException as exc:
+        return None, ['获取引用对象失败: {}'.format(exc)]
+
+
+def resolve_manifest_item_objects(item):
+    org_name = item.get('org') or 'DEFAULT'
+    org = resolve_org(org_name)
+    if org is None:
+        return None, ['组织 `{}` 不存在'.format(org_name)]
+    server_proxy.set_org(org)
+
+    data_operator = AssetPermissionDataOperator()
+    data_operator.set_org(org)
+    data_operator.set_name(item['name'])
+    data_operator.set_actions(item.get('actions'))
+
+    errors = []
+    for username in item['users']:
+        user = server_proxy.get_user(username)
+        if user is None:
+            errors.append('用户 `{}` 不存在'.format(username))
+        else:
+            data_operator.add_user(user)
+
+    for system_user_name in item['system_users']:
+        system_user = server_proxy.get_system_user(system_user_name)
+        if system_user is None:
+            errors.append('系统用户 `{}` 不存在'.format(system_user_name))
+        else:
+            data_operator.add_system_user(system_user)
+
+    assets, assets_hostname_missing = server_proxy.get_assets(item['assets'])
+    data_operator.add_assets(assets)
+    if assets_hostname_missing:
+        errors.append('资产不存在: {}'.format(assets_hostname_missing))
+
+    return data_operator, errors
+
+
+class CheckpointJournal:
+    """ 批量创建的检查点日志 - 以 jsonl 追加记录每条授权规则的进度，用于中断后恢复执行
+
+    事件:
+    * resolved: 引用对象已获取，记录授权规则数据 (对象ID) 和清单条目的哈希，恢复时不再请求服务端；
+      开始新的一次执行，之前的进度作废
+    * submitted: 开始创建，恢复时需检查授权规则是否已在服务端创建
+    * created: 创建完成，恢复时跳过
+    * failed: 创建失败，恢复时重新创建
+    """
+
+    def __init__(self, file_path, resume=False):
+        self.file_path = file_path
+        self.lock = threading.Lock()
+        self.entries = {}
+        if resume and os.path.isfile(file_path):
+            self.load()
+        self.file = open(file_path, 'a' if resume else 'w', encoding='utf-8')
+
+    def load(self):
+        with open(self.file_path, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    # 中断时最后一行可能没有写完整
+                    continue
+                entry = self.entries.setdefault(record['index'], {})
+                if entry.get('name') not in [None, record['name']]:
+                    entry.clear()
+                if record['event'] == 'resolved':
+                    entry.clear()
+                entry['name'] = record['name']
+                entry[record['event']] = record
+                if record['event'] == 'failed':
+                    entry.pop('created', None)
+                if record['event'] == 'created':
+                    entry.pop('failed', None)
+
+    @staticmethod
+    def get_item_hash(item):
+        """ 清单条目的哈希，用于判断恢复执行时清单条目是否已修改 """
+        content = json.dumps(item, sort_keys=True, ensure_ascii=False)
+        return hashlib.sha256(content.encode('utf-8')).hexdigest()
+
+    def get(self, index, name, item_hash):
+        """ 获取清单中一条授权规则的进度，名称或内容不一致 (清单已修改) 时视为没有进度 """
+        entry = self.entries.get(index)
+        if entry is None or entry.get('name') != name:
+            return {}
+        if entry.get('resolved', {}).get('hash') != item_hash:
+            return {}
+        return entry
+
+    def is_modified(self, index, name, item_hash):
+        """ 日志中有该授权规则的进度，但清单条目已修改 """
+        entry = self.entries.get(index)
+        return entry is not None and entry.get('name') == name and not self.get(index, name, item_hash)
+
+    def record(self, event, index, name, **fields):
+        record = dict(fields, event=event, index=index, name=name)
+        line = json.dumps(record, ensure_ascii=False) + '\n'
+        with self.lock:
+            self.file.write(line)
+            self.file.flush()
+
+    def close(self):
+        self.file.close()
+
+
+def create_asset_permissions_journaled(journal, index, name, data, org, skip_existing):
+    """ 创建 (同步模式下同步) 授权规则并记录到检查点日志
+    :return: (授权规则列表, 错误信息列表, 状态)
+    """
+    journal.record('submitted', index, name)
+    try:
+        if args.sync:
+            permissions, errors, status = sync_asset_permission(data, org)
+        else:
+            permissions, errors = create_asset_permissions_chunked(data, org, skip_existing=skip_existing)
+            status = 'created'
+    except requests.RequestException as exc:
+        permissions, errors = [], ['请求失败: {}'.format(exc)]
+    if errors:
+        journal.record('failed', index, name, errors=errors)
+        status = 'failed'
+    else:
+        journal.record('created', index, name, status=status, permissions=[
+            {'id': permission['id'], 'name': permission['name']} for permission in permissions
+        ])
+    return permissions, errors, status
+
+
+async def prefetch_manifest_assets(items):
+    """ 使用 AsyncServerProxy 在单个线程中并发获取清单中所有资产，结果写入 server_proxy 的缓存
+
+    之后逐条解析授权规则时，资产直接从缓存中获取
+    """
+    hostnames_by_org = {}
+    for item in items:
+        if validate_manifest_item(item):
+            continue
+        org_name = item.get('org') or 'DEFAULT'
+        hostnames_by_org.setdefault(org_name, []).extend(item['assets'])
+
+    async with AsyncServerProxy(
+        memo=server_proxy.memo, cache=server_proxy.cache, stats=server_proxy.stats
+    ) as proxy:
+        proxy.set_token_data(server_proxy.token_data)
+        for org_name, hostnames in hostnames_by_org.items():
+            try:
+                org = resolve_org(org_name)
+                if org is None:
+                    continue
+                proxy.set_org(org)
+                _, hostnames_missing = await proxy.get_assets(hostnames)
+            except (requests.RequestException, aiohttp.ClientError, asyncio.TimeoutError) as exc:
+                # 预取失败不影响执行，逐条解析授权规则时重新获取
+                logger.error('组织 `{}` 预取资产失败: {!r}', org_name, exc)
+                continue
+            logger.info(
+                '组织 `{}` 预取资产 {} 个，不存在 {} 个',
+                org_name, len(set(hostnames)), len(set(hostnames_missing))
+            )
+
+
+def create_from_manifest(manifest_file_path, journal):
+    """ 根据清单文件批量创建授权规则，不需要用户输入
+
+    * 读取并校验清单
+    * 依次获取每条授权规则引用的对象
+    * 引用对象获取完成后立即提交到线程池并发创建 (并发数为 create_max_workers)
+      引用对象存在错误的规则不创建
+    * 每条授权规则的进度记录到检查点日志，恢复执行 (--resume) 时
+        - 跳过已创建的授权规则
+        - 已获取引用对象的授权规则直接使用日志中的数据
+        - 已开始创建但没有结果的授权规则，先检查服务端是否已存在同名授权规则
+    * 同步模式 (--sync) 下与服务端已存在的授权规则比较，只创建或更新有变化的授权规则
+
+    :param journal: CheckpointJournal
+    :return: 每条授权规则的执行结果 (与清单顺序一致), list of dict
+    """
+    items = load_manifest(manifest_file_path)
+    client_proxy.print_info('清单中共有 {} 条授权规则'.format(len(items)))
+
+    def get_progress(index, item):
+        if not isinstance(item, dict):
+            return {}
+        return journal.get(index, item.get('name'), journal.get_item_hash(item))
+
+    if config.requests_async:
+        items_pending = [
+            item for index, item in enumerate(items)
+            if 'created' not in get_progress(index, item) and 'resolved' not in get_progress(index, item)
+        ]
+        asyncio.run(prefetch_manifest_assets(items_pending))
+
+    results = []
+    futures = []
+    with ThreadPoolExecutor(max_workers=config.requests_create_max_workers) as executor:
+        for index, item in enumerate(items):
+            result = {
+                'index': index,
+                'name': item.get('name') if isinstance(item, dict) else None,
+                'status': 'invalid',
+                'permissions': [],
+                'errors': validate_manifest_item(item)
+            }
+            results.append(result)
+            if result['errors']:
+                continue
+
+            item_hash = journal.get_item_hash(item)
+            progress = journal.get(index, item['name'], item_hash)
+            if journal.is_modified(index, item['name'], item_hash):
+                msg = '清单第 {} 条授权规则 `{}` 已修改，忽略检查点日志中的进度'.format(index + 1, item['name'])
+                logger.info(msg)
+                client_proxy.print_info(msg)
+            if 'created' in progress:
+                result['status'] = progress['created'].get('status', 'created')
+                result['resumed'] = True
+                result['permissions'] = progress['created']['permissions']
+                continue
+
+            result['correlation_id'] = new_correlation_id()
+            if 'resolved' in progress:
+                data = progress['resolved']['data']
+                org = progress['resolved']['org']
+            else:
+                data_operator, errors = resolve_manifest_item(item)
+                result['errors'] = errors
+                if errors:
+                    result['status'] = 'unresolved'
+                    continue
+                data = data_operator.get_asset_permission_data()
+                org = data_operator.org
+                journal.record(
+                    'resolved', index, item['name'], org=org, data=data, hash=item_hash
+                )
+
+            if args.sync:
+                # 在提交到线程池之前获取，每个组织只请求一次；
+                # 获取失败时索引不完整，无法判断授权规则是否已存在，该条授权规则不执行
+                try:
+                    server_proxy.get_asset_permissions_index(org)
+                except requests.RequestException as exc:
+                    result['status'] = 'failed'
+                    result['errors'] = ['获取已存在的授权规则失败: {}'.format(exc)]
+                    continue
+
+            skip_existing = 'submitted' in progress
+            future = submit_with_context(
+                executor, create_asset_permissions_journaled,
+                journal, index, item['name'], data, org, skip_existing
+            )
+            futures.append((result, future))
+
+        for result, future in futures:
+            permissions, errors, status = future.result()
+            result['permissions'] = permissions
+            result['errors'] = errors
+            result['status'] = status
+
+    for result in results:
+        if result['errors']:
+            client_proxy.print_error('[{}] {}: {}'.format(result['index'], result['name'], result['errors']))
+    return results
+
+
+def write_manifest_report(results, report_file_path):
+    """ 将批量创建的执行结果写入 json 文件 """
+    report = {
+        'total': len(results),
+        'created': len([r for r in results if r['status'] == 'created']),
+        'updated': len([r for r in results if r['status'] == 'updated']),
+        'unchanged': len([r for r in results if r['status'] == 'unchanged']),
+        'results': results
+    }
+    with open(report_file_path, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=4, ensure_ascii=False)
+    client_proxy.print_info('执行结果已写入: {}'.format(report_file_path))
 
 
 def init_client_proxy():
@@ -676,16 +2584,37 @@ def init_logger():
     return Logger()
 
 
+def init_audit_logger():
+    """ 初始化审计日志记录者，记录每个请求的耗时等信息 (jsonl)
+    :return: Logger 或 None (未启用)
+    """
+    if not config.log_audit:
+        return None
+    return Logger(config.log_audit_file_path)
+
+
+def init_args():
+    """ 解析命令行参数
+    :return: argparse.Namespace
+    """
+    parser = argparse.ArgumentParser(description='快速创建 JumpServer 资产授权规则')
+    parser.add_argument('config_file_path', nargs='?', default='../config_example.yml', help='配置文件路径')
+    parser.add_argument('--no-cache', action='store_true', help='不使用本地查询缓存')
+    parser.add_argument('--manifest', help='授权规则清单文件 (.yml/.jsonl/.csv)，指定后以非交互方式批量创建')
+    parser.add_argument('--report', help='批量创建执行结果的输出文件，默认为 <清单文件>.report.json')
+    parser.add_argument('--journal', help='批量创建的检查点日志文件，默认为 <清单文件>.journal.jsonl')
+    parser.add_argument('--resume', action='store_true', help='根据检查点日志恢复中断的批量创建，跳过已完成的授权规则')
+    parser.add_argument('--sync', action='store_true', help='同步模式，已存在且没有变化的授权规则跳过，有变化的只更新变化的字段')
+    parser.add_argument('--stats-json', help='执行结束后将各接口的请求统计写入该 json 文件')
+    return parser.parse_args()
+
+
 def init_config():
     """ 初始化配置
     :return: Config
     """
 
-    args = sys.argv
-    if len(args) >= 2:
-        config_file_path = args[1]
-    else:
-        config_file_path = '../config_example.yml'
+    config_file_path = args.config_file_path
 
     if not os.path.isfile(config_file_path):
         msg = '`{}` is not a file'.format(config_file_path)
@@ -698,7 +2627,10 @@ def init_config():
     with open(config_file_path, 'rb') as f:
         config_dict = yaml.safe_load(f)
 
-    return Config(config_dict)
+    conf = Config(config_dict)
+    if args.no_cache:
+        conf.cache_enabled = False
+    return conf
 
 
 def main():
@@ -707,22 +2639,40 @@ def main():
     功能:
     *
     * 执行创建前的准备工作
-    * 创建
+    * 创建 (指定 --manifest 时根据清单批量创建)
     * 执行创建后的收尾工作
     *
     """
     permissions_created = []
 
+    if args.manifest and not os.path.isfile(args.manifest):
+        client_proxy.quit('`{}` is not a file'.format(args.manifest))
+
     before_creation()
 
+    if args.manifest:
+        journal_file_path = args.journal or '{}.journal.jsonl'.format(args.manifest)
+        if args.resume:
+            client_proxy.print_info('从检查点日志恢复执行: {}'.format(journal_file_path))
+        journal = CheckpointJournal(journal_file_path, resume=args.resume)
+        results = create_from_manifest(args.manifest, journal)
+        journal.close()
+        write_manifest_report(results, args.report or '{}.report.json'.format(args.manifest))
+        permissions_created = [
+            permission for result in results if result['status'] != 'unchanged'
+            for permission in result['permissions']
+        ]
+        after_creation(permissions_created)
+        server_proxy.close()
+        return
+
     if not client_proxy.input_if_continue():
         client_proxy.quit()
 
     while True:
-        permission = create()
+        permissions = create()
 
-        if permission is not None:
-            permissions_created.append(permission)
+        permissions_created.extend(permissions)
 
         if client_proxy.input_if_continue():
             continue
@@ -731,21 +2681,27 @@ def main():
 
     after_creation(permissions_created)
 
+    server_proxy.close()
+
 
 if __name__ == '__main__':
     """
+    * 解析命令行参数
     * 初始化客户端代理者
     * 初始化配置
     * 初始化服务代理者
     * 初始化日志记录者
+    * 初始化审计日志记录者
     * 进入主程序
     """
+    args = init_args()
     client_proxy = init_client_proxy()
     config = init_config()
     server_proxy = init_server_proxy()
     logger = init_logger()
+    audit_logger = init_audit_logger()
 
     logger.info('-'*50)
-    logger.info('时间: {}'.format(datetime.datetime.now()))
+    logger.info('时间: {}', datetime.datetime.now())
 
     main()
@@ -0,0 +1,179 @@
+# -*- coding: utf-8 -*-
+
+"""
+test_manifest.py - 基于本地模拟服务 (fake_server.py) 的清单批量创建测试
+
+以清单方式 (--manifest) 非交互执行 main.py，检查恢复执行 (--resume) 及同步模式 (--sync) 的结果
+
+执行方式：
+python -m unittest test_manifest
+"""
+
+import os
+import sys
+import json
+import tempfile
+import unittest
+import subprocess
+
+import yaml
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from fake_server import FakeJumpServer  # noqa: E402
+from benchmark import SCRIPT_DIR, write_config  # noqa: E402
+
+
+class ManifestTestCase(unittest.TestCase):
+    extra_config = {}
+
+    def setUp(self):
+        self.work_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.work_dir.cleanup)
+        self.server = FakeJumpServer(assets_count=50).start()
+        self.addCleanup(self.server.stop)
+        self.config_file_path = write_config(self.work_dir.name, self.server.url, self.extra_config)
+        self.manifest_file_path = os.path.join(self.work_dir.name, 'manifest.yml')
+        self.journal_file_path = self.manifest_file_path + '.journal.jsonl'
+
+    def write_manifest(self, permissions):
+        with open(self.manifest_file_path, 'w') as f:
+            yaml.safe_dump({'permissions': permissions}, f)
+
+    def run_main(self, *args):
+        """ 执行 main.py，返回执行结果 {名称: 状态} 及完整的执行结果 """
+        process = subprocess.run(
+            [sys.executable, os.path.join(SCRIPT_DIR, 'main.py'), self.config_file_path,
+             '--manifest', self.manifest_file_path] + list(args),
+            cwd=self.work_dir.name, stdin=subprocess.DEVNULL, stdout=subprocess.PIPE, stderr=subprocess.PIPE
+        )
+        self.assertEqual(process.returncode, 0, process.stderr.decode()[-2000:])
+        with open(self.manifest_file_path + '.report.json') as f:
+            report = json.load(f)
+        return {result['name']: result['status'] for result in report['results']}, report
+
+    def get_permissions(self):
+        """ 服务端的授权规则 {名称: 授权规则} """
+        permissions = {}
+        for permission in self.server.data.permissions.values():
+            self.assertNotIn(permission['name'], permissions, '授权规则重复: {}'.format(permission['name']))
+            permissions[permission['name']] = permission
+        return permissions
+
+    def get_assets_id(self, hostnames):
+        return sorted(self.server.data.assets_by_hostname[hostname]['id'] for hostname in hostnames)
+
+    @staticmethod
+    def permission(name, hostnames, users=None):
+        return {
+            'name': name,
+            'users': users or ['admin'],
+            'system_users': ['root'],
+            'assets': hostnames
+        }
+
+
+def hostnames(start, stop):
+    return ['asset-hostname-{:02d}'.format(i) for i in range(start, stop)]
+
+
+class ResumeTest(ManifestTestCase):
+    extra_config = {'requests': {'create_max_retries': 0}}
+
+    def test_resume_skips_created_entries(self):
+        self.write_manifest([self.permission('perm-a', hostnames(1, 6)), self.permission('perm-b', hostnames(6, 9))])
+        statuses, _ = self.run_main()
+        self.assertEqual(statuses, {'perm-a': 'created', 'perm-b': 'created'})
+        permissions = self.get_permissions()
+
+        statuses, report = self.run_main('--resume')
+        self.assertEqual(statuses, {'perm-a': 'created', 'perm-b': 'created'})
+        self.assertTrue(all(result.get('resumed') for result in report['results']))
+        self.assertEqual(self.get_permissions(), permissions)
+
+    def test_resume_retries_failed_entry(self):
+        create_permission = self.server.data.create_permission
+        failed = []
+
+        def create_permission_fail_once(data, org_id):
+            if data.get('name') == 'perm-b' and not failed:
+                failed.append(data['name'])
+                return 400, {'detail': 'Injected error'}
+            return create_permission(data, org_id)
+
+        self.server.data.create_permission = create_permission_fail_once
+        self.write_manifest([self.permission('perm-a', hostnames(1, 6)), self.permission('perm-b', hostnames(6, 9))])
+        statuses, _ = self.run_main()
+        self.assertEqual(statuses, {'perm-a': 'created', 'perm-b': 'failed'})
+        self.assertEqual(sorted(self.get_permissions()), ['perm-a'])
+
+        statuses, report = self.run_main('--resume')
+        self.assertEqual(statuses, {'perm-a': 'created', 'perm-b': 'created'})
+        self.assertEqual([result.get('resumed') for result in report['results']], [True, None])
+        permissions = self.get_permissions()
+        self.assertEqual(sorted(permissions), ['perm-a', 'perm-b'])
+        self.assertEqual(sorted(permissions['perm-b']['assets']), self.get_assets_id(hostnames(6, 9)))
+
+    def test_resume_completes_interrupted_entry(self):
+        """ 已开始创建但没有结果 (只创建了部分资产) 的授权规则，恢复时只关联缺少的资产，不重复创建 """
+        self.write_manifest([self.permission('perm-a', hostnames(1, 11))])
+        self.run_main()
+        with open(self.journal_file_path) as f:
+            records = [json.loads(line) for line in f]
+        with open(self.journal_file_path, 'w') as f:
+            for record in records:
+                if record['event'] != 'created':
+                    f.write(json.dumps(record) + '\n')
+        permission = self.get_permissions()['perm-a']
+        permission['assets'] = permission['assets'][:3]
+
+        statuses, _ = self.run_main('--resume')
+        self.assertEqual(statuses, {'perm-a': 'created'})
+        self.assertEqual(sorted(self.get_permissions()['perm-a']['assets']), self.get_assets_id(hostnames(1, 11)))
+
+    def test_resume_ignores_progress_of_edited_entry(self):
+        self.write_manifest([self.permission('perm-a', hostnames(1, 6))])
+        self.run_main()
+        self.write_manifest([self.permission('perm-a', hostnames(1, 8))])
+
+        statuses, report = self.run_main('--resume', '--sync')
+        self.assertEqual(statuses, {'perm-a': 'updated'})
+        self.assertIsNone(report['results'][0].get('resumed'))
+        self.assertEqual(sorted(self.get_permissions()['perm-a']['assets']), self.get_assets_id(hostnames(1, 8)))
+
+
+class SyncTest(ManifestTestCase):
+
+    def test_rerun_is_unchanged(self):
+        self.write_manifest([
+            self.permission('perm-a', hostnames(1, 6)),
+            self.permission('perm-b', hostnames(6, 9)),
+            # 与 perm-b 成员相同
+            self.permission('perm-c', hostnames(6, 9)),
+        ])
+        statuses, _ = self.run_main('--sync')
+        self.assertEqual(statuses, {'perm-a': 'created', 'perm-b': 'created', 'perm-c': 'unchanged'})
+        permissions = self.get_permissions()
+
+        statuses, report = self.run_main('--sync')
+        self.assertEqual(statuses, {'perm-a': 'unchanged', 'perm-b': 'unchanged', 'perm-c': 'unchanged'})
+        self.assertEqual(report['unchanged'], 3)
+        self.assertEqual(self.get_permissions(), permissions)
+
+    def test_rerun_after_edit_updates_then_is_unchanged(self):
+        self.write_manifest([self.permission('perm-a', hostnames(1, 11))])
+        self.run_main('--sync')
+        self.write_manifest([self.permission('perm-a', hostnames(5, 15), users=['admin', 'user-01'])])
+
+        statuses, _ = self.run_main('--sync')
+        self.assertEqual(statuses, {'perm-a': 'updated'})
+        permission = self.get_permissions()['perm-a']
+        self.assertEqual(sorted(permission['assets']), self.get_assets_id(hostnames(5, 15)))
+        self.assertEqual(len(permission['users']), 2)
+
+        statuses, _ = self.run_main('--sync')
+        self.assertEqual(statuses, {'perm-a': 'unchanged'})
+
+
+if __name__ == '__main__':
+    unittest.main()
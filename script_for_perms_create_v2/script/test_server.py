@@ -1,20 +1,29 @@
 import requests
+from email.utils import formatdate
 from httpsig.requests_auth import HTTPSignatureAuth
 
+from fake_server import FakeJumpServer
+
 __all__ = [
     'test'
 ]
 
 
-def test():
-    key_id = 'b55d354a-3d9c-486b-a4d4-997a8e094f83'
-    key_secret = '3f81551d-ece1-4cf2-99a7-24d09ca26e3e'
+def test(url=None, key_id='b55d354a-3d9c-486b-a4d4-997a8e094f83', key_secret='3f81551d-ece1-4cf2-99a7-24d09ca26e3e'):
+    """ 使用 API Key 签名请求健康检查接口
+
+    :param url: JumpServer 服务地址，为 None 时启动本地模拟服务
+    """
+    fake_server = None
+    if url is None:
+        fake_server = FakeJumpServer().start()
+        url = fake_server.url
 
     headers = {
         'X-JMS-ORG': '',
         'Content-Type': 'application/json',
         'Accept': 'application/json',
-        'Date': "Mon, 17 Feb 2014 06:11:05 GMT",
+        'Date': formatdate(usegmt=True),
     }
     print('>> headers: {} >> auth >> {}'.format(headers, ''))
 
@@ -26,9 +35,7 @@ def test():
         headers=signature_headers
     )
 
-    url = 'http://jumpserver-test.fit2cloud.com/api/health/'
-
-    res = requests.get(url, headers=headers, auth=auth)
+    res = requests.get('{}/api/health/'.format(url), headers=headers, auth=auth)
 
     print(res.status_code)
 
@@ -36,3 +43,10 @@ def test():
 
     if res.status_code == 200:
         print(res.json())
+
+    if fake_server is not None:
+        fake_server.stop()
+
+
+if __name__ == '__main__':
+    test()